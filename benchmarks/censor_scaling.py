@@ -0,0 +1,76 @@
+"""
+Blur Master Stage 2 scaling: thread backend (per-image and batched detection) vs
+process backend on 4 / 8 / 16 cores.
+
+    python benchmarks/censor_scaling.py <folder with jpg/png> [--cores 4 8 16] [--batch 16]
+
+Every case runs in a fresh interpreter. On Linux it is pinned to the first N
+cores with os.sched_setaffinity before anything is imported, so the detector's
+onnxruntime pools (and worker processes) are sized for and bound to those cores;
+a session built in an earlier, differently pinned case is never reused.
+Elsewhere only worker/thread counts change.
+Output images go to a temp dir and are discarded.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _pin(cores):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(range(cores)))
+
+
+def _case(folder, cores, backend, workers, intra, batch):
+    """Child process: pin, then import and build everything. Prints img/s."""
+    _pin(cores)
+    from mediatool.image.pipelines.blur_master import NUDENET_CLASSES, _run_censoring
+
+    with tempfile.TemporaryDirectory() as out:
+        t0 = time.perf_counter()
+        stats = _run_censoring(folder, out, NUDENET_CLASSES, 60, 151, 1.0, detect_batch_size=batch,
+                               backend=backend, workers=workers, ort_threads=(intra, 0))
+        print(stats["images"] / (time.perf_counter() - t0))
+
+
+def _run(folder, cores, backend, workers, intra, batch=0):
+    cmd = [sys.executable, __file__, folder, "--case", str(cores), backend, str(workers), str(intra), str(batch)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, check=True)
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--cores", type=int, nargs="+", default=[4, 8, 16])
+    ap.add_argument("--batch", type=int, default=16, help="detect_batch_size of the batched row")
+    ap.add_argument("--case", nargs=5, help=argparse.SUPPRESS)   # cores backend workers intra batch
+    args = ap.parse_args()
+    if args.case:
+        cores, backend, workers, intra, batch = args.case
+        _case(args.folder, int(cores), backend, int(workers), int(intra), int(batch))
+        return
+
+    from mediatool.image.pipelines.blur_master import split_cores
+
+    available = os.cpu_count() or 1
+    rows = []
+    for cores in args.cores:
+        if cores > available:
+            print(f"skip {cores} cores: only {available} available")
+            continue
+        workers, intra = split_cores(cores)
+        rows.append((cores, "thread", cores, 0, _run(args.folder, cores, "thread", cores, 0)))
+        rows.append((cores, "batched", cores, 0, _run(args.folder, cores, "thread", cores, 0, args.batch)))
+        rows.append((cores, "process", workers, intra, _run(args.folder, cores, "process", workers, intra)))
+
+    print(f"\n{'cores':>5} {'backend':>8} {'workers':>7} {'intra':>5} {'img/s':>8}")
+    for cores, backend, workers, intra, ips in rows:
+        print(f"{cores:>5} {backend:>8} {workers:>7} {intra or 'auto':>5} {ips:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Duplicate Remover hashing: full decode vs reduced decode (fast_decode=True).
+The two do not give identical hashes; this measures by how much.
+
+    python benchmarks/hash_decode.py <folder with images> [--methods average phash dhash]
+
+Per hash method: ms per image for both paths, the share of images whose hashes
+are identical, and the mean / max Hamming distance between the two (64 bits).
+"""
+import argparse
+import time
+
+from mediatool.image.pipelines.dedupe import HASH_METHODS, _image_hash, _iter_images
+
+
+def _timed(paths, method, fast):
+    t0 = time.perf_counter()
+    hashes = [_image_hash(p, method, fast) for p in paths]
+    return hashes, (time.perf_counter() - t0) / len(paths)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--methods", nargs="+", default=list(HASH_METHODS), choices=list(HASH_METHODS))
+    args = ap.parse_args()
+
+    paths = _iter_images(args.folder)
+    if not paths:
+        raise SystemExit("no images")
+    for p in paths:   # warm the OS file cache so both paths read from memory
+        with open(p, "rb") as f:
+            f.read()
+
+    print(f"{len(paths)} images")
+    print(f"{'method':>8} {'full ms':>8} {'fast ms':>8} {'speedup':>7} {'same':>6} {'mean d':>6} {'max d':>5}")
+    for method in args.methods:
+        full, t_full = _timed(paths, method, fast=False)
+        fast, t_fast = _timed(paths, method, fast=True)
+        dists = [bin(a ^ b).count("1") for a, b in zip(full, fast) if a is not None and b is not None]
+        same = sum(d == 0 for d in dists) / len(dists) if dists else 0.0
+        mean = sum(dists) / len(dists) if dists else 0.0
+        print(f"{method:>8} {t_full * 1000:>8.1f} {t_fast * 1000:>8.1f} {t_full / t_fast:>6.1f}x "
+              f"{same:>6.1%} {mean:>6.2f} {max(dists, default=0):>5}")
+
+
+if __name__ == "__main__":
+    main()
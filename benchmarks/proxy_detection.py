@@ -0,0 +1,78 @@
+"""
+Accuracy + speed of proxy detection (run_blur_master(detect_long_edge=...)) against
+full-resolution NudeNet detection.
+
+    python benchmarks/proxy_detection.py <folder with jpg/png> [--edges 640 1280 2048]
+
+For every long edge: detect time per image, and how well the mapped-back boxes
+agree with full-res boxes (same class, IoU >= 0.5): recall, precision, mean IoU.
+"""
+import argparse
+import os
+import time
+
+from mediatool.image.pipelines.blur_master import (
+    _detect_full_res, _get_nude_detector, _list_images, _read_image,
+)
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def _match(ref, got, thr=0.5):
+    """Greedy same-class matching -> list of IoUs of matched pairs."""
+    ious, used = [], set()
+    for r in ref:
+        best, best_j = 0.0, None
+        for j, g in enumerate(got):
+            if j in used or g["class"] != r["class"]:
+                continue
+            v = _iou(r["box"], g["box"])
+            if v > best:
+                best, best_j = v, j
+        if best_j is not None and best >= thr:
+            used.add(best_j)
+            ious.append(best)
+    return ious
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--edges", type=int, nargs="+", default=[640, 1280, 2048])
+    args = ap.parse_args()
+
+    nude = _get_nude_detector()
+    images = [_read_image(os.path.join(args.folder, fn)) for fn in _list_images(args.folder)]
+    images = [img for img in images if img is not None]
+    if not images:
+        raise SystemExit("no readable images")
+
+    def run(edge):
+        t0 = time.perf_counter()
+        dets = _detect_full_res(nude, images, edge)
+        return dets, (time.perf_counter() - t0) / len(images)
+
+    ref, ref_t = run(None)
+    n_ref = sum(len(d) for d in ref)
+    print(f"{'long edge':>9} {'ms/img':>8} {'recall':>7} {'precision':>9} {'mean IoU':>8}")
+    print(f"{'full':>9} {ref_t * 1000:>8.1f} {'-':>7} {'-':>9} {'-':>8}")
+    for edge in args.edges:
+        got, t = run(edge)
+        ious = [v for r, g in zip(ref, got) for v in _match(r, g)]
+        n_got = sum(len(d) for d in got)
+        recall = len(ious) / n_ref if n_ref else 1.0
+        precision = len(ious) / n_got if n_got else 1.0
+        mean_iou = f"{sum(ious) / len(ious):>8.3f}" if ious else f"{'-':>8}"
+        print(f"{edge:>9} {t * 1000:>8.1f} {recall:>7.3f} {precision:>9.3f} {mean_iou}")
+
+
+if __name__ == "__main__":
+    main()
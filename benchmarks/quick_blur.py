@@ -0,0 +1,67 @@
+"""
+Quick Blur engines: ms per image (decode + blur) and error vs. the exact blur.
+
+    python benchmarks/quick_blur.py <image or folder> [--radii 10 25 78 150]
+                                    [--engines exact box downscale] [--max-error N]
+                                    [--no-reduced-decode]
+
+Encoding is left out; it costs the same for every engine. "engine" is the one
+actually used after max_error fallbacks. Errors are 8-bit levels over all pixels
+and channels: max, mean and 99.9th percentile.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mediatool.image.pipelines.blur_script_interactive import (
+    QUICK_BLUR_ENGINES,
+    SUPPORTED_EXTENSIONS,
+    _blur_image,
+    _resolve_engine,
+)
+
+
+def _blur_all(paths, radius, engine, small_radius, reduced_decode):
+    t0 = time.perf_counter()
+    out = [_blur_image(p, radius, engine, small_radius, reduced_decode) for p in paths]
+    return out, (time.perf_counter() - t0) / len(paths)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--radii", nargs="+", type=float, default=[10, 25, 78, 150])
+    ap.add_argument("--engines", nargs="+", default=list(QUICK_BLUR_ENGINES), choices=list(QUICK_BLUR_ENGINES))
+    ap.add_argument("--max-error", type=int, default=None)
+    ap.add_argument("--no-reduced-decode", action="store_true")
+    args = ap.parse_args()
+
+    src = Path(args.path)
+    paths = [src] if src.is_file() else sorted(
+        p for p in src.iterdir() if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
+    if not paths:
+        raise SystemExit("no images")
+    for p in paths:   # warm the OS file cache
+        p.read_bytes()
+
+    print(f"{len(paths)} images")
+    print(f"{'radius':>6} {'engine':>10} {'ms':>8} {'speedup':>7} {'max':>5} {'mean':>6} {'p99.9':>6}")
+    for radius in args.radii:
+        ref, t_ref = _blur_all(paths, radius, "exact", None, False)
+        ref = [np.asarray(im.convert("RGBA"), dtype=np.int16) for im in ref]
+        for name in args.engines:
+            engine, small_radius = _resolve_engine(name, radius, args.max_error)
+            if engine == "exact":
+                print(f"{radius:>6g} {engine:>10} {t_ref * 1000:>8.1f} {1:>6.1f}x {0:>5} {0:>6.2f} {0:>6.1f}")
+                continue
+            out, t = _blur_all(paths, radius, engine, small_radius, not args.no_reduced_decode)
+            diff = np.concatenate([np.abs(np.asarray(im.convert("RGBA"), dtype=np.int16) - r).ravel()
+                                   for im, r in zip(out, ref)])
+            print(f"{radius:>6g} {engine:>10} {t * 1000:>8.1f} {t_ref / t:>6.1f}x "
+                  f"{int(diff.max()):>5} {diff.mean():>6.2f} {np.percentile(diff, 99.9):>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
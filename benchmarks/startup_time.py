@@ -0,0 +1,109 @@
+"""
+Startup cost of the App: per-module import times and time until the window is up.
+
+    python benchmarks/startup_time.py [--top 25] [--check SECONDS]
+
+Import report: `python -X importtime -c "import mediatool.ui.app"` in a fresh
+interpreter, top modules by cumulative time. Window: a fresh interpreter does
+what `python -m mediatool` does, up to the first drawn frame, then exits
+(skipped when Tk cannot open a display, e.g. headless CI).
+
+--check makes this a regression gate: exit 1 if the window (or, headless, the
+import) takes longer than SECONDS, or if a heavy dependency gets imported at
+startup again.
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+HEAVY = ("cv2", "numpy", "tqdm", "tensorflow", "imagehash", "nudenet", "onnxruntime", "scipy")
+
+_SHOW_WINDOW = """
+from mediatool.ui import App
+app = App()
+app.update()
+print("WINDOW")
+app.destroy()
+"""
+
+_LOADED = """
+import sys
+import mediatool.ui.app
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True)
+
+
+def import_report(top):
+    """[(cumulative_s, self_s, module)] of the slowest imports, slowest first."""
+    proc = _python("import mediatool.ui.app", "-X", "importtime")
+    rows = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        name = name.strip()
+        rows[name] = max(rows.get(name, (0, 0)), (int(cum_us) / 1e6, int(self_us) / 1e6))
+    return sorted(((cum, own, name) for name, (cum, own) in rows.items()), reverse=True)[:top]
+
+
+def time_import():
+    t0 = time.perf_counter()
+    proc = _python("import mediatool.ui.app")
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+    return time.perf_counter() - t0
+
+
+def time_window():
+    """Seconds from interpreter start to the first drawn frame, None without a display."""
+    t0 = time.perf_counter()
+    proc = _python(_SHOW_WINDOW)
+    if "WINDOW" not in proc.stdout:
+        return None
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--check", type=float, metavar="SECONDS")
+    args = ap.parse_args()
+
+    # warm the bytecode cache so the numbers are about imports, not compilation
+    _python("import mediatool.ui.app")
+
+    print(f"{'cumulative':>10} {'self':>8}  module")
+    for cum, own, name in import_report(args.top):
+        print(f"{cum * 1000:>8.1f}ms {own * 1000:>6.1f}ms  {name}")
+
+    imp = time_import()
+    win = time_window()
+    proc = _python(_LOADED.format(heavy=HEAVY))
+    if proc.returncode:   # a broken import must not read as "nothing heavy loaded"
+        raise SystemExit(proc.stderr)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    print(f"\nimport mediatool.ui.app: {imp:.3f}s (incl. interpreter start)")
+    print(f"window shown: {f'{win:.3f}s' if win is not None else 'n/a (no display)'}")
+    print(f"heavy modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+    if args.check is not None:
+        measured = win if win is not None else imp
+        failed = False
+        if measured > args.check:
+            print(f"FAIL: startup {measured:.3f}s > {args.check:.3f}s")
+            failed = True
+        if loaded:
+            print(f"FAIL: imported at startup: {', '.join(loaded)}")
+            failed = True
+        if failed:
+            raise SystemExit(1)
+        print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+H.264 transcode: one ffmpeg process vs. segmented mode.
+
+    python benchmarks/transcode_segments.py <video> [--workers 2 4 8] [--threads N]
+                                            [--preset medium] [--crf 20]
+
+Per run: wall time, speed as a multiple of realtime, output MB, and whether
+frame count and duration match the input (transcode_h264's verify check, which
+raises on a mismatch). Outputs go to a temp folder and are deleted.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from mediatool.video.ops import scan_video
+from mediatool.video.pipelines.transcode_ffmpeg import transcode_h264
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--workers", nargs="+", type=int, default=[2, 4])
+    ap.add_argument("--threads", type=int, default=None, help="libx264 threads per segmented encoder")
+    ap.add_argument("--preset", default="medium")
+    ap.add_argument("--crf", type=int, default=20)
+    args = ap.parse_args()
+
+    info = scan_video(args.video)
+    print(f"{info['frames']} frames, {info['duration']:.1f}s, {len(info['keyframes'])} keyframes\n")
+    print(f"{'mode':>14} {'seconds':>8} {'speed':>7} {'MB':>8} {'check':>6}")
+    runs = [("single", {})] + [(f"segmented x{n}", {"segmented": True, "workers": n, "threads": args.threads})
+                               for n in args.workers]
+    for name, kwargs in runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            try:
+                out = transcode_h264(args.video, tmp, crf=args.crf, preset=args.preset, verify=True, **kwargs)
+                check = "ok"
+            except RuntimeError:
+                out, check = Path(tmp) / (Path(args.video).stem + "_h264.mp4"), "FAIL"
+            seconds = time.perf_counter() - t0
+            mb = out.stat().st_size / 1e6 if out.exists() else 0.0
+        print(f"{name:>14} {seconds:>8.1f} {info['duration'] / seconds:>6.2f}x {mb:>8.2f} {check:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+WebP conversion: time and bytes per encoder profile and PNG mode on a corpus.
+
+    python benchmarks/webp_profiles.py <folder with png/jpg> [--profiles fast balanced max]
+                                       [--png lossless lossy auto] [--workers 1]
+
+convert_folder_to_webp deletes its sources, so every run works on a fresh temp
+copy of the folder. Reports wall time, files/s, MB out and, for PNGs, how many
+were written lossless.
+"""
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from mediatool.image.pipelines.convert_webp import WEBP_PROFILES, convert_folder_to_webp
+
+_PNG_MODES = {"lossless": True, "lossy": False, "auto": "auto"}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--profiles", nargs="+", default=list(WEBP_PROFILES), choices=list(WEBP_PROFILES))
+    ap.add_argument("--png", nargs="+", default=list(_PNG_MODES), choices=list(_PNG_MODES))
+    ap.add_argument("--quality", type=int, default=90)
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    src = Path(args.folder)
+    n_in = sum(1 for p in src.rglob("*") if p.suffix.lower() in {".png", ".jpg", ".jpeg"})
+    mb_in = sum(p.stat().st_size for p in src.rglob("*") if p.is_file()) / 1e6
+    print(f"{n_in} images, {mb_in:.1f} MB\n")
+    print(f"{'profile':>8} {'png':>8} {'seconds':>8} {'files/s':>8} {'MB out':>8} {'ratio':>6} {'lossless':>8}")
+    for profile in args.profiles:
+        for mode in args.png:
+            with tempfile.TemporaryDirectory() as tmp:
+                work = Path(tmp) / "corpus"
+                shutil.copytree(src, work)
+                report = convert_folder_to_webp(work, quality=args.quality, png_lossless=_PNG_MODES[mode],
+                                                workers=args.workers, profile=profile)
+            tp = report.throughput
+            pngs = [r for r in report.results if r["src"].lower().endswith(".png")]
+            lossless = f"{sum(r['lossless'] for r in pngs)}/{len(pngs)}"
+            ratio = tp["mb_out"] / tp["mb_in"] if tp["mb_in"] else 0.0
+            print(f"{profile:>8} {mode:>8} {tp['seconds']:>8.2f} {tp['files_per_s']:>8.2f} "
+                  f"{tp['mb_out']:>8.2f} {ratio:>6.3f} {lossless:>8}")
+
+
+if __name__ == "__main__":
+    main()
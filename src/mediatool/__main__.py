@@ -1,4 +1,7 @@
+import multiprocessing
+
 from mediatool.ui import App
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()   # process pools in a frozen (packaged) build
     App().mainloop()
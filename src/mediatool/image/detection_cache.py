@@ -0,0 +1,151 @@
+# src/mediatool/image/detection_cache.py
+"""
+On-disk cache of raw NudeNet detections (class, score, box).
+
+Key = (content hash of the image bytes, detector model identity), so renaming
+or copying a file still hits, and swapping the model invalidates everything.
+Backed by one SQLite file; safe to share between threads (one connection +
+lock) and between worker processes (WAL + busy timeout).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+DEFAULT_MAX_ENTRIES = 200_000
+_TRIM_EVERY = 256   # puts between size checks
+_TOUCH_EVERY = 256   # hits whose access time is held back before one batched UPDATE
+_TOUCH_SECONDS = 5.0
+
+
+def content_key(data) -> str:
+    """Hash of the encoded file bytes (bytes / bytearray / uint8 ndarray)."""
+    return hashlib.blake2b(memoryview(data), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def model_identity(model_path: str, input_size: int = 320) -> str:
+    """Identity of an ONNX detector: model file content + inference resolution."""
+    h = hashlib.blake2b(digest_size=12)
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f"{os.path.basename(model_path)}:{input_size}:{h.hexdigest()}"
+
+
+def default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mediatool", "detections.sqlite")
+
+
+class DetectionCache:
+    """
+    Bounded (LRU by last access) detection store.
+
+    max_entries: size bound, enforced every few hundred puts and by evict();
+    None/0 = unbounded.
+
+    Hits do not write: their access times are queued and written in one UPDATE
+    with the next put, every _TOUCH_EVERY hits or _TOUCH_SECONDS, and by evict()
+    and close(), so concurrent readers do not queue on the WAL write lock.
+    """
+
+    def __init__(self, path: str, max_entries: int | None = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._touched = {}   # (image, model) -> access time not yet written
+        self._flushed = time.monotonic()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            " image TEXT NOT NULL, model TEXT NOT NULL, dets TEXT NOT NULL,"
+            " atime REAL NOT NULL, PRIMARY KEY (image, model))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS detections_atime ON detections(atime)")
+        self._db.commit()
+
+    def get(self, image_key: str, model_id: str):
+        """Cached detections list, or None on a miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT dets FROM detections WHERE image = ? AND model = ?", (image_key, model_id)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[(image_key, model_id)] = time.time()
+            if len(self._touched) >= _TOUCH_EVERY or time.monotonic() - self._flushed > _TOUCH_SECONDS:
+                self._write_touched()
+                self._db.commit()
+        return json.loads(row[0])
+
+    def _write_touched(self) -> None:
+        """Queued access times -> one UPDATE; the caller holds the lock and commits."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE detections SET atime = ? WHERE image = ? AND model = ?",
+                [(atime, image, model) for (image, model), atime in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed = time.monotonic()
+
+    def put(self, image_key: str, model_id: str, detections) -> None:
+        raw = [
+            {"class": d["class"], "score": float(d["score"]), "box": [int(v) for v in d["box"]]}
+            for d in detections
+        ]
+        with self._lock:
+            self._touched.pop((image_key, model_id), None)
+            self._write_touched()
+            self._db.execute(
+                "INSERT OR REPLACE INTO detections (image, model, dets, atime) VALUES (?, ?, ?, ?)",
+                (image_key, model_id, json.dumps(raw), time.time()),
+            )
+            self._db.commit()
+            self._puts += 1
+            trim = self._puts % _TRIM_EVERY == 0
+        if trim:
+            self.evict()
+
+    def evict(self, max_entries: int | None = None) -> int:
+        """Drop least recently used rows above `max_entries` (default: self.max_entries)."""
+        limit = self.max_entries if max_entries is None else max_entries
+        if not limit:
+            return 0
+        with self._lock:
+            self._write_touched()
+            cur = self._db.execute(
+                "DELETE FROM detections WHERE rowid IN ("
+                " SELECT rowid FROM detections ORDER BY atime DESC LIMIT -1 OFFSET ?)",
+                (int(limit),),
+            )
+            self._db.commit()
+        return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM detections")
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._write_touched()
+                self._db.commit()
+            except sqlite3.ProgrammingError:   # already closed
+                return
+            self._db.close()
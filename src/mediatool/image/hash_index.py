@@ -0,0 +1,87 @@
+# src/mediatool/image/hash_index.py
+"""
+Near-duplicate lookup over perceptual hashes stored as integers.
+
+Multi-index hashing: the hash is cut into `chunks` equal bit ranges and every
+stored hash is filed under each of its chunk values. Two hashes within Hamming
+distance k differ in at most k // chunks bits of at least one chunk
+(pigeonhole), so a query only probes, per chunk, the table entries at most
+that many bit flips away from its own chunk value and verifies those
+candidates with a popcount. With 3 chunks of ~21 bits a million 64-bit hashes
+leave buckets nearly empty, so a lookup at threshold 8 costs a few hundred
+dict probes instead of a scan (~chunks = bits / log2(n), Norouzi et al.).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from itertools import combinations
+
+try:
+    _popcount = int.bit_count   # Python >= 3.10
+except AttributeError:
+    def _popcount(x: int) -> int:
+        return bin(x).count("1")
+
+
+def _flip_masks(width: int, radius: int) -> list[int]:
+    """All `width`-bit masks with at most `radius` bits set (0 first)."""
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(width), r):
+            m = 0
+            for b in bits:
+                m |= 1 << b
+            masks.append(m)
+    return masks
+
+
+class HammingIndex:
+    """
+    threshold: max Hamming distance that counts as a match (0 = exact only,
+    a single dict lookup). bits: hash length (64 for imagehash hash_size=8).
+    chunks: number of bit ranges. Probes per chunk grow with
+    C(bits / chunks, threshold // chunks), bucket sizes with n / 2**(bits / chunks);
+    3 balances both for 64-bit hashes, thresholds up to ~11 and ~10^6 entries.
+    """
+
+    def __init__(self, threshold: int = 0, bits: int = 64, chunks: int = 3):
+        if threshold < 0:
+            raise ValueError("threshold must be >= 0")
+        self.threshold = int(threshold)
+        self.bits = int(bits)
+        n = max(1, min(int(chunks), self.bits)) if self.threshold else 1
+        bounds = [i * self.bits // n for i in range(n + 1)]
+        self._spans = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        radius = self.threshold // n
+        self._flips = [_flip_masks((hi - lo), radius) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables = [defaultdict(list) for _ in self._spans]
+        self._hashes: list[int] = []
+        self._values: list = []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, h: int, value=None) -> None:
+        idx = len(self._hashes)
+        self._hashes.append(h)
+        self._values.append(value)
+        for (lo, mask), table in zip(self._spans, self._tables):
+            table[(h >> lo) & mask].append(idx)
+
+    def nearest(self, h: int):
+        """(distance, value) of the closest stored hash within threshold, else None."""
+        best = None
+        checked = set()
+        for (lo, mask), flips, table in zip(self._spans, self._flips, self._tables):
+            key = (h >> lo) & mask
+            for flip in flips:
+                for idx in table.get(key ^ flip, ()):
+                    if idx in checked:
+                        continue
+                    checked.add(idx)
+                    d = _popcount(h ^ self._hashes[idx])
+                    if d <= self.threshold and (best is None or d < best[0]):
+                        best = (d, idx)
+                        if d == 0:
+                            return 0, self._values[idx]
+        return None if best is None else (best[0], self._values[best[1]])
@@ -0,0 +1,73 @@
+# src/mediatool/image/hash_store.py
+"""
+Persistent perceptual-hash index for the Duplicate Remover.
+
+One SQLite file (by default inside the merge folder) with a row per
+(path, hash method): file size, mtime in ns and the 64-bit hash. A file whose
+size and mtime still match its row is never decoded again. Rows are read in
+bulk with load() (one query, even for a few hundred thousand files) and
+written in batched transactions.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+
+INDEX_NAME = ".dedupe_index.sqlite"
+_COMMIT_EVERY = 500   # puts per transaction
+
+_SIGN = 1 << 63
+
+
+def _to_sql(h: int) -> int:
+    """SQLite integers are signed 64-bit; store unsigned hashes two's-complement."""
+    return h - (1 << 64) if h >= _SIGN else h
+
+
+def _from_sql(v: int) -> int:
+    return v + (1 << 64) if v < 0 else v
+
+
+class HashStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT NOT NULL, method TEXT NOT NULL, size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL, hash INTEGER NOT NULL, PRIMARY KEY (path, method))"
+        )
+        self._db.commit()
+        self._pending = 0
+
+    def load(self, method: str) -> dict[str, tuple[int, int, int]]:
+        """{path: (size, mtime_ns, hash)} of every row for `method`."""
+        rows = self._db.execute(
+            "SELECT path, size, mtime_ns, hash FROM hashes WHERE method = ?", (method,)
+        )
+        return {p: (size, mtime, _from_sql(h)) for p, size, mtime, h in rows}
+
+    def put(self, path: str, method: str, size: int, mtime_ns: int, h: int) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO hashes (path, method, size, mtime_ns, hash)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (path, method, size, mtime_ns, _to_sql(h)),
+        )
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self.commit()
+
+    def forget(self, paths) -> None:
+        self._db.executemany("DELETE FROM hashes WHERE path = ?", ((p,) for p in paths))
+        self._pending += 1
+
+    def commit(self) -> None:
+        self._db.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._db.close()
@@ -1 +1,80 @@
 # small image helpers live here (resize, hashing, etc.)
+from __future__ import annotations
+
+from mediatool.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Large-kernel blur engines (see fast_blur). Error vs. cv2.GaussianBlur, 8-bit levels:
+#   "gaussian"  exact (reference)
+#   "box"       3 stacked box filters, O(1) per pixel in the kernel size.
+#               guaranteed <= 10 (analytic, any content, k = 51..251) + <= 3 rounding.
+#               measured max 3 on 4000x3000 photos; max 7 on 20-80 px black/white
+#               checkerboards (k = 51..251), the worst synthetic case found
+#   "downscale" INTER_AREA shrink -> small Gaussian -> INTER_LINEAR upscale.
+#               measured max 9-12 (image borders) / mean < 0.5, fastest for k >= 101
+BLUR_ENGINES = ("gaussian", "box", "downscale")
+
+_DOWNSCALE_TARGET_SIGMA = 6.0   # sigma left for the small image; lower = faster, rougher
+
+
+def gaussian_sigma(ksize: int) -> float:
+    """Sigma OpenCV derives for GaussianBlur(img, (ksize, ksize), 0)."""
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+def _box_sizes(sigma: float, passes: int = 3) -> list[int]:
+    """Odd box widths whose `passes`-fold convolution has ~the given sigma."""
+    ideal = np.sqrt(12 * sigma * sigma / passes + 1)
+    lo = int(ideal)
+    if lo % 2 == 0:
+        lo -= 1
+    lo = max(lo, 1)
+    hi = lo + 2
+    m = round((12 * sigma * sigma - passes * lo * lo - 4 * passes * lo - 3 * passes) / (-4 * lo - 4))
+    m = min(max(m, 0), passes)
+    return [lo if i < m else hi for i in range(passes)]
+
+
+def fast_blur(img, ksize: int, engine: str = "gaussian", sigma: float = 0, border: int | None = None):
+    """
+    Drop-in for cv2.GaussianBlur(img, (ksize, ksize), sigma) with a selectable engine.
+    ksize may be 0 when sigma is given (same rule as OpenCV). border: cv2.BORDER_*
+    for the "box" engine (default reflect-101, like GaussianBlur; BORDER_REPLICATE
+    matches Pillow's GaussianBlur).
+    """
+    if engine not in BLUR_ENGINES:
+        raise ValueError(f"Unknown blur engine: {engine} (expected one of {BLUR_ENGINES})")
+    if engine == "gaussian":
+        return cv2.GaussianBlur(img, (ksize, ksize), sigma)
+
+    sigma = sigma or gaussian_sigma(ksize)
+    if engine == "box":
+        out = img
+        border = cv2.BORDER_DEFAULT if border is None else border
+        for w in _box_sizes(sigma):
+            out = cv2.blur(out, (w, w), borderType=border)
+        return out
+
+    # downscale
+    f = int(sigma // _DOWNSCALE_TARGET_SIGMA)
+    h, w = img.shape[:2]
+    if f <= 1 or min(h, w) < 2 * f:
+        return cv2.GaussianBlur(img, (ksize, ksize), sigma)
+    small = cv2.resize(img, (w // f, h // f), interpolation=cv2.INTER_AREA)
+    # the area shrink already contributes ~f/2 of blur at full scale
+    small_sigma = np.sqrt(max(sigma * sigma - f * f / 4, 0.25)) / f
+    small = cv2.GaussianBlur(small, (0, 0), small_sigma)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def blur_error(img, ksize: int, engine: str) -> dict:
+    """Measure an engine against the exact Gaussian on your own image: {max, mean, p999}."""
+    ref = cv2.GaussianBlur(img, (ksize, ksize), 0).astype(np.int16)
+    diff = np.abs(fast_blur(img, ksize, engine).astype(np.int16) - ref)
+    return {
+        "max": int(diff.max()),
+        "mean": float(diff.mean()),
+        "p999": float(np.percentile(diff, 99.9)),
+    }
@@ -1,10 +1,20 @@
 # src/mediatool/image/pipelines/blur_master.py
 
 import os
-import cv2
-import numpy as np
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+from mediatool.image.detection_cache import (
+    DEFAULT_MAX_ENTRIES, DetectionCache, content_key, default_cache_path, model_identity,
+)
+from mediatool.image.ops import BLUR_ENGINES, fast_blur
+from mediatool.utils.concurrency import INFLIGHT_PER_WORKER, bounded_submit
+from mediatool.utils.lazy import lazy_import
+from mediatool.utils.manifest import RunManifest, fingerprint
 
 # --- Optional Stage 1 (photo copy) ---
 try:
@@ -12,12 +22,6 @@ try:
 except Exception:
     PhotoCopier = None
 
-# TensorFlow is only needed for some NudeNet builds; make it optional
-try:
-    import tensorflow as tf
-except Exception:
-    tf = None
-
 # Pillow (for optimization + watermark)
 from PIL import Image, ImageFilter  # noqa: F401  (ImageFilter reserved for future use)
 try:
@@ -25,6 +29,11 @@ try:
 except Exception:
     RESAMPLE = Image.LANCZOS
 
+# Heavy deps load on first use, so importing this module (e.g. for WATERMARK_SETS
+# when the App starts) stays cheap.
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
 
 # ======================= DEFAULTS / CONSTANTS =======================
 
@@ -59,14 +68,25 @@ NUDENET_CLASSES = [
 _BLUR_KERNEL_SIZE = 151   # odd number
 _PADDING = 60
 _CIRCLE_RADIUS_SCALE = 1.0
+_WM_CACHE_BYTES = 192 << 20   # scaled watermarks kept by _scaled_watermark (4 bytes/pixel)
+_DETECT_BATCH_SIZE = 0    # 0/1 = one detect() per image; 8/16/32 = batched ONNX calls
 
 _nudectl = None  # cached NudeDetector instance
+_nudectl_threads = (0, 0)  # (intra_op, inter_op) it was built with
+_det_caches = {}  # (pid, path) -> DetectionCache; forked workers must not reuse the parent's
+_det_cache_lock = threading.Lock()
+_wm_cache = OrderedDict()  # (path, width, opacity) -> _scaled_watermark result, LRU order
+_wm_cache_lock = threading.Lock()
 
 
 # ======================= TF / NudeNet helpers =======================
 
 def _init_tf():
-    if tf is None:
+    # TensorFlow is only needed for some NudeNet builds; optional, and imported here
+    # rather than at module level because the import alone takes seconds.
+    try:
+        import tensorflow as tf
+    except Exception:
         return
     try:
         gpus = tf.config.list_physical_devices("GPU")
@@ -79,17 +99,66 @@ def _init_tf():
         print(f"TensorFlow initialization error: {e}")
 
 
-def _get_nude_detector():
-    """Lazy-create NudeNet detector when first needed."""
-    global _nudectl
-    if _nudectl is None:
+def _get_nude_detector(intra_threads=0, inter_threads=0):
+    """
+    Lazy-create NudeNet detector when first needed (one per process).
+    intra/inter_threads > 0 pin the onnxruntime thread pools (0 = onnxruntime default,
+    i.e. every core); asking for a different pinning rebuilds the detector.
+    """
+    global _nudectl, _nudectl_threads
+    threads = (int(intra_threads or 0), int(inter_threads or 0))
+    if _nudectl is None or _nudectl_threads != threads:
         from nudenet import NudeDetector  # import lazily to speed module import
         print("Initializing NudeNet detector (this may take a moment)...")
-        _nudectl = NudeDetector()
+        det = NudeDetector()
+        if any(threads):
+            import onnxruntime as ort
+            opts = ort.SessionOptions()
+            if threads[0]:
+                opts.intra_op_num_threads = threads[0]
+            if threads[1]:
+                opts.inter_op_num_threads = threads[1]
+            sess = det.onnx_session
+            det.onnx_session = ort.InferenceSession(
+                sess._model_path, sess_options=opts, providers=sess.get_providers()
+            )
+        _nudectl, _nudectl_threads = det, threads
         print("✅ NudeNet detector ready.")
     return _nudectl
 
 
+def split_cores(cores=None, workers=None, intra=None):
+    """
+    Suggested (workers, intra_op_threads) for the process censoring backend.
+
+    Each worker alternates decode/blur/encode (one core; cv2 is pinned to 1 thread
+    inside workers) with inference (intra_op_threads cores). Keeping
+    workers * intra_op_threads ~= cores saturates the machine without the
+    oversubscription of N threads x N onnxruntime threads. On 30-50 MP JPEGs
+    decode/encode dominate the 320px inference, so the default favours workers:
+    intra = 1 below 8 cores, else 2; workers = cores // intra.
+    Pass `workers` to fix the worker count and get the matching intra count, or
+    `intra` for the reverse (both given: returned as is).
+    """
+    cores = max(1, int(cores or os.cpu_count() or 1))
+    if workers and intra:
+        return int(workers), int(intra)
+    if workers:
+        workers = max(1, min(int(workers), cores))
+        return workers, max(1, cores // workers)
+    if intra:
+        intra = max(1, min(int(intra), cores))
+        return max(1, cores // intra), intra
+    intra = 1 if cores < 8 else 2
+    return max(1, cores // intra), intra
+
+
+def _init_censor_worker(intra_threads, inter_threads):
+    """ProcessPoolExecutor initializer: build this worker's detector once."""
+    cv2.setNumThreads(1)
+    _get_nude_detector(intra_threads, inter_threads)
+
+
 # ======================= STAGE 2: CENSORING =======================
 
 def _has_any(detections, wanted):
@@ -99,108 +168,574 @@ def _has_any(detections, wanted):
     return False
 
 
-def _censor_one(args):
-    (filename, in_dir, out_dir, classes, padding, blur_kernel, circle_scale) = args
+def _read_image(path):
+    """Read + decode once (np.fromfile also copes with non-ASCII paths on Windows)."""
+    return _read_image_and_key(path, keyed=False)[0]
+
+
+def _read_image_and_key(path, keyed=True):
+    """(decoded image or None, content hash of the file bytes or None)."""
+    data = np.fromfile(path, dtype=np.uint8)
+    if data.size == 0:
+        return None, None
+    key = content_key(data) if keyed else None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR), key
+
+
+def _get_detection_cache(ctx):
+    """This process's DetectionCache for ctx['cache_path'] (None when caching is off)."""
+    path = ctx.get("cache_path")
+    if not path:
+        return None
+    with _det_cache_lock:
+        cache = _det_caches.get((os.getpid(), path))
+        if cache is None:
+            cache = _det_caches[os.getpid(), path] = DetectionCache(path, ctx.get("cache_max"))
+            # also runs when a pool worker process exits, so its queued hit times land
+            Finalize(cache, cache.close, exitpriority=10)
+    return cache
+
+
+def _detector_id(nude, long_edge=None):
+    base = model_identity(nude.onnx_session._model_path, nude.input_width)
+    return f"{base}:proxy{long_edge}" if long_edge else base
+
+
+def _detection_proxy(img, long_edge):
+    """
+    (image to run the detector on, factor back to full resolution).
+    NudeNet pads the full image to a square and shrinks it to 320px with a bilinear
+    blobFromImage; a bilinear proxy feeds it comparable pixels and skips the
+    full-resolution pad/convert (INTER_AREA would cost ~50 ms on 8K, more than it saves).
+    """
+    h, w = img.shape[:2]
+    if not long_edge or max(h, w) <= long_edge:
+        return img, 1.0
+    scale = max(h, w) / float(long_edge)
+    size = (max(1, round(w / scale)), max(1, round(h / scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_LINEAR), scale
+
+
+def _to_full_res(det, scale, shape):
+    """Map proxy detections back to the full-resolution image, clipped to it."""
+    if scale == 1.0:
+        return det
+    h, w = shape[:2]
+    out = []
+    for d in det:
+        x, y, bw, bh = d["box"]
+        x, y = min(int(x * scale), w), min(int(y * scale), h)
+        bw, bh = min(int(round(bw * scale)), w - x), min(int(round(bh * scale)), h - y)
+        out.append({**d, "box": [x, y, bw, bh]})
+    return out
+
+
+def _detect_full_res(nude, images, long_edge):
+    """Detections (full-res coordinates) for decoded images, optionally via proxies."""
+    proxies = [_detection_proxy(img, long_edge) for img in images]
+    raw = [nude.detect(p) for p, _ in proxies]
+    return [_to_full_res(det, scale, img.shape) for det, (_, scale), img in zip(raw, proxies, images)]
+
+
+def _cached_detect(nude, img, key, cache, long_edge=None):
+    """(detections for one image, True if they came from the cache)."""
+    if cache is not None:
+        det = cache.get(key, _detector_id(nude, long_edge))
+        if det is not None:
+            return det, True
+    det = _detect_full_res(nude, [img], long_edge)[0]
+    if cache is not None:
+        cache.put(key, _detector_id(nude, long_edge), det)
+    return det, False
+
+
+def _blur_detections(img, det, classes, padding, blur_kernel, circle_scale, engine="gaussian"):
+    """Circular blur over every wanted detection, in place (engine: see ops.BLUR_ENGINES)."""
+    margin = blur_kernel // 2
+    for r in det:
+        if r["class"] in classes:
+            x, y, w, h = r["box"]
+            x = max(x - padding, 0)
+            y = max(y - padding, 0)
+            w = min(w + 2 * padding, img.shape[1] - x)
+            h = min(h + 2 * padding, img.shape[0] - y)
+            if w <= 0 or h <= 0:
+                continue
+
+            center = (w // 2, h // 2)
+            radius = int(min(w, h) / 2 * circle_scale)
+
+            # Only the circle's bounding square (+ kernel margin, clipped to the
+            # padded box) is blurred: circle pixels see the same neighbourhood
+            # and box-edge reflection as when blurring the whole box.
+            x0 = max(center[0] - radius - margin, 0)
+            y0 = max(center[1] - radius - margin, 0)
+            x1 = min(center[0] + radius + margin + 1, w)
+            y1 = min(center[1] + radius + margin + 1, h)
+
+            roi = img[y + y0:y + y1, x + x0:x + x1]
+            if roi.size == 0:
+                continue
+
+            mask = np.zeros(roi.shape[:2], dtype=np.uint8)
+            cv2.circle(mask, (center[0] - x0, center[1] - y0), radius, 255, -1)
+
+            blurred = fast_blur(roi, blur_kernel, engine)
+            np.copyto(roi, blurred, where=mask.astype(bool)[:, :, None])
 
-    nude = _get_nude_detector()
-    src = os.path.join(in_dir, filename)
-    dst = os.path.join(out_dir, filename)
+
+def _blur_and_write(filename, index, img, det, ctx, timings):
+    """
+    Blur the wanted detections of an already decoded image, then write the
+    CENSORED copy and/or (fused mode) the final resized + watermarked JPEG.
+    """
+    t0 = time.perf_counter()
+    if _has_any(det, ctx["classes"]):
+        _blur_detections(img, det, ctx["classes"], ctx["padding"], ctx["blur_kernel"],
+                         ctx["circle_scale"], ctx["blur_engine"])
+    timings["blur"] = time.perf_counter() - t0
+
+    if ctx["write_censored"]:
+        t0 = time.perf_counter()
+        cv2.imwrite(os.path.join(ctx["out_dir"], filename), img)
+        timings["encode"] = time.perf_counter() - t0
+
+    fin = ctx["finish"]
+    if fin:
+        t0 = time.perf_counter()
+        out_path = os.path.join(fin["output_folder"], f"{fin['prefix']}_{index}.jpg")
+        _finish_in_memory(img, out_path, fin["watermark_path"], fin["watermark_land_path"],
+                          fin["max_width"], fin["max_height"], fin["quality"], fin["opacity"])
+        timings["watermark"] = time.perf_counter() - t0
+
+
+def _censor_one(filename, index, ctx):
+    """
+    Censor one file. Returns (message or None, {stage: seconds}, content hash or
+    None, True if the detections came from the cache).
+    """
+    nude = _get_nude_detector(*ctx["ort_threads"])
+    cache = _get_detection_cache(ctx)
+    src = os.path.join(ctx["in_dir"], filename)
+    timings = {}
+    key = None
+    hit = False
 
     try:
-        det = nude.detect(src)
-        img = cv2.imread(src)
+        t0 = time.perf_counter()
+        img, key = _read_image_and_key(src, keyed=cache is not None or ctx["keyed"])
+        timings["decode"] = time.perf_counter() - t0
         if img is None:
-            return f"Skip {filename}: cannot read."
-
-        if _has_any(det, classes):
-            for r in det:
-                if r["class"] in classes:
-                    x, y, w, h = r["box"]
-                    x = max(x - padding, 0)
-                    y = max(y - padding, 0)
-                    w = min(w + 2 * padding, img.shape[1] - x)
-                    h = min(h + 2 * padding, img.shape[0] - y)
-
-                    roi = img[y:y+h, x:x+w]
-                    if roi.size == 0:
-                        continue
-
-                    mask = np.zeros(roi.shape[:2], dtype=np.uint8)
-                    center = (w // 2, h // 2)
-                    radius = int(min(w, h) / 2 * circle_scale)
-                    cv2.circle(mask, center, radius, 255, -1)
-
-                    blurred = cv2.GaussianBlur(roi, (blur_kernel, blur_kernel), 0)
-                    img[y:y+h, x:x+w] = np.where(mask[:, :, None] == 255, blurred, roi)
-
-        cv2.imwrite(dst, img)
-        return None
+            return f"Skip {filename}: cannot read.", timings, key, hit
+
+        # the detector gets the same decoded array -> no second read from disk
+        t0 = time.perf_counter()
+        det, hit = _cached_detect(nude, img, key, cache, ctx["detect_long_edge"])
+        timings["detect"] = time.perf_counter() - t0
+
+        _blur_and_write(filename, index, img, det, ctx, timings)
+        return None, timings, key, hit
+    except Exception as e:
+        return f"Error {filename}: {e}", timings, key, hit
+
+
+def _finish_one(filename, index, img, det, key, ctx):
+    """Batched mode, per-image tail: blur + write with detections already known."""
+    timings = {}
+    try:
+        _blur_and_write(filename, index, img, det, ctx, timings)
+        return None, timings, key
+    except Exception as e:
+        return f"Error {filename}: {e}", timings, key
+
+
+def _prepare_detection(img, input_size, long_edge):
+    """
+    Detector input for one decoded image: the proxy resize, then NudeNet's own
+    letterbox pad + blobFromImage. Returns (1x3xSxS blob, NudeNet's
+    postprocess metadata, proxy scale).
+    """
+    from nudenet.nudenet import _read_image
+    proxy, scale = _detection_proxy(img, long_edge)
+    blob, *meta = _read_image(proxy, input_size)
+    return blob, meta, scale
+
+
+def _decode_for_detect(path, keyed, cache, model_id, input_size, long_edge):
+    """
+    Batched mode, pool job: decode, look up the cache and, on a miss, build the
+    detector input here, so the full-resolution pad/blob (~100 ms on 48 MP)
+    runs on the workers and the coordinating thread only runs inference.
+    Returns (img or None, key, cached detections or None, prepared input or None,
+    {stage: seconds}, message or None).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    try:
+        img, key = _read_image_and_key(path, keyed)
+    except Exception:
+        img, key = None, None
+    timings["decode"] = time.perf_counter() - t0
+    if img is None:
+        return None, key, None, None, timings, f"Skip {os.path.basename(path)}: cannot read."
+
+    t0 = time.perf_counter()
+    try:
+        det = cache.get(key, model_id) if cache is not None else None
+        prepared = None if det is not None else _prepare_detection(img, input_size, long_edge)
     except Exception as e:
-        return f"Error {filename}: {e}"
+        return None, key, None, None, timings, f"Error {os.path.basename(path)}: {e}"
+    finally:
+        timings["detect"] = time.perf_counter() - t0
+    return img, key, det, prepared, timings, None
+
+
+def _detect_prepared(nude, prepared, shapes):
+    """
+    Full-resolution detections for _prepare_detection outputs: one ONNX call on
+    the stacked blobs (one per image before NudeNet 3.4, whose model only
+    takes batch 1), then NudeNet's per-image postprocess.
+    """
+    from nudenet.nudenet import _postprocess
+    blobs = [blob for blob, _, _ in prepared]
+    if hasattr(nude, "detect_batch"):   # NudeNet >= 3.4
+        outputs = nude.onnx_session.run(None, {nude.input_name: np.vstack(blobs)})[0]
+    else:
+        outputs = np.vstack([nude.onnx_session.run(None, {nude.input_name: b})[0] for b in blobs])
+    dets = []
+    for j, ((_, meta, scale), shape) in enumerate(zip(prepared, shapes)):
+        x_ratio, y_ratio, x_pad, y_pad, width, height = meta
+        det = _postprocess([outputs[j:j + 1]], x_pad, y_pad, x_ratio, y_ratio, width, height,
+                           nude.input_width, nude.input_height)
+        dets.append(_to_full_res(det, scale, shape))
+    return dets
+
+
+def _tally(stats, msg, timings):
+    for stage, secs in timings.items():
+        stats[stage] += secs
+    if msg:
+        stats["failed"] += 1
+        from tqdm import tqdm
+        tqdm.write(f"ℹ️ {msg}")
+
+
+def _run_censoring_batched(numbered, total, ctx, batch_size, workers, stats, on_done):
+    """
+    Batched Stage 2: a thread pool decodes and preprocesses batch N+1 (cache
+    lookup, proxy resize, letterbox + blob; see _decode_for_detect) while the
+    blobs of batch N go through the detector in one ONNX call; the detections
+    are then fanned back out to per-image blur/write jobs on the same pool.
+    `numbered` is consumed lazily, one batch at a time.
+    """
+    from tqdm import tqdm
+
+    nude = _get_nude_detector(*ctx["ort_threads"])
+    cache = _get_detection_cache(ctx)
+    model_id = _detector_id(nude, ctx["detect_long_edge"])
+    numbered = iter(numbered)
+    batches = iter(lambda: list(islice(numbered, batch_size)), [])
 
+    with ThreadPoolExecutor(max_workers=workers) as ex, \
+            tqdm(total=total, desc="🖼️  Censoring images", unit="image") as bar:
 
-def _run_censoring(in_dir, out_dir, classes, padding, blur_kernel, circle_scale):
-    os.makedirs(out_dir, exist_ok=True)
-    files = [f for f in os.listdir(in_dir) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
-    tasks = [
-        (fn, in_dir, out_dir, classes, padding, blur_kernel, circle_scale) for fn in files
-    ]
-    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
-        futures = [ex.submit(_censor_one, t) for t in tasks]
-        for fut in tqdm(as_completed(futures), total=len(files), desc="🖼️  Censoring images", unit="image"):
-            msg = fut.result()
-            if msg:
-                tqdm.write(f"ℹ️ {msg}")
-    return out_dir
+        def decode(batch):
+            keyed = cache is not None or ctx["keyed"]
+            return [ex.submit(_decode_for_detect, os.path.join(ctx["in_dir"], fn), keyed, cache, model_id,
+                              nude.input_width, ctx["detect_long_edge"])
+                    for _, fn in batch]
+
+        def drain(futures):
+            for fut in as_completed(futures):
+                msg, timings, key = fut.result()
+                _tally(stats, msg, timings)
+                if not msg and on_done:
+                    on_done(futures[fut], key)
+                bar.update(1)
+
+        pending = {}
+        next_batch = next(batches, [])
+        next_decoded = decode(next_batch)
+        while next_batch:
+            batch, decoded = next_batch, [f.result() for f in next_decoded]
+            next_batch = next(batches, [])
+            next_decoded = decode(next_batch)
+
+            ready, dets, prepared, misses = [], [], [], []
+            for (index, fn), (img, key, det, prep, timings, msg) in zip(batch, decoded):
+                if img is None:
+                    _tally(stats, msg, timings)
+                    bar.update(1)
+                    continue
+                _tally(stats, None, timings)
+                if det is None:
+                    misses.append(len(ready))
+                    prepared.append(prep)
+                ready.append((index, fn, img, key))
+                dets.append(det)
+            if not ready:
+                continue
+
+            stats["cache_hits"] += len(ready) - len(misses)
+            t0 = time.perf_counter()
+            try:
+                if misses:
+                    fresh = _detect_prepared(nude, prepared, [ready[i][2].shape for i in misses])
+                    for i, det in zip(misses, fresh):
+                        dets[i] = det
+                        if cache is not None:
+                            cache.put(ready[i][3], model_id, det)
+            except Exception as e:
+                for _, fn, _, _ in ready:
+                    _tally(stats, f"Error {fn}: {e}", {})
+                    bar.update(1)
+                continue
+            finally:
+                stats["detect"] += time.perf_counter() - t0
+
+            # keep at most one batch of blur jobs in flight (bounded memory)
+            drain(pending)
+            pending = {
+                ex.submit(_finish_one, fn, index, img, det, key, ctx): fn
+                for (index, fn, img, key), det in zip(ready, dets)
+            }
+        drain(pending)
+
+
+def _iter_images(in_dir):
+    """Image file names of `in_dir`, streamed (listdir order, nothing kept in memory)."""
+    with os.scandir(in_dir) as it:
+        for entry in it:
+            if entry.name.lower().endswith((".jpg", ".jpeg", ".png")):
+                yield entry.name
+
+
+def _list_images(in_dir):
+    return list(_iter_images(in_dir))
+
+
+def _run_censoring(in_dir, out_dir, classes, padding, blur_kernel, circle_scale,
+                   detect_batch_size=0, finish=None, write_censored=True,
+                   blur_engine="gaussian", backend="thread", workers=None,
+                   ort_threads=(0, 0), cache_path=None, cache_max=DEFAULT_MAX_ENTRIES,
+                   items=None, on_done=None, detect_long_edge=None):
+    """Censor every image of `in_dir` into `out_dir`.
+
+    backend="thread": one shared detector, `workers` threads (default cpu_count).
+      detect_batch_size > 1 switches to batched detection (see _run_censoring_batched);
+      otherwise every thread runs the full decode/detect/blur/write chain per file.
+    backend="process": `workers` processes, each with its own detector built once
+      by _init_censor_worker; no GIL contention in the numpy/cv2 glue.
+    ort_threads: (intra_op, inter_op) onnxruntime threads per detector, see split_cores().
+    cache_path: SQLite DetectionCache file; hits skip inference and only redo the blur.
+    detect_long_edge: detect on a downscaled proxy with this long edge, boxes are
+      mapped back and the blur stays at full resolution (None = full-res detection).
+
+    finish: optional dict(output_folder, prefix, watermark_path, watermark_land_path,
+    max_width, max_height, quality, opacity) -> fused Stage 3: the censored array is
+    resized + watermarked in memory and encoded once as `<prefix>_<n>.jpg`.
+    write_censored=False skips the CENSORED copy (only useful together with finish).
+
+    items: optional [(index, filename)] to process instead of every image of `in_dir`
+    (incremental runs); on_done(filename, content_hash) is called from this thread
+    for every file that finished without error.
+
+    Returns stats dict: {images, failed, cache_hits, decode, detect, blur, encode, watermark}
+    (stage values are summed worker seconds; batched detect is the workers' cache
+    lookups and preprocessing plus the wall time of the ONNX calls).
+    """
+    from tqdm import tqdm
+
+    if backend not in ("thread", "process"):
+        raise ValueError(f"Unknown censor backend: {backend}")
+    if backend == "process" and detect_batch_size and detect_batch_size > 1:
+        raise ValueError("detect_batch_size is only supported by the thread backend.")
+    workers = int(workers or os.cpu_count() or 1)
+    ort_threads = tuple(ort_threads)
+
+    if write_censored:
+        os.makedirs(out_dir, exist_ok=True)
+    if finish:
+        os.makedirs(finish["output_folder"], exist_ok=True)
+    if items is not None:
+        items = list(items)
+        numbered, total = items, len(items)
+    else:
+        # stream the folder; a counting pass keeps the progress bar without a name list
+        numbered = enumerate(_iter_images(in_dir), start=1)
+        total = sum(1 for _ in _iter_images(in_dir))
+    stats = {"images": total, "failed": 0, "cache_hits": 0, "decode": 0.0, "detect": 0.0, "blur": 0.0,
+             "encode": 0.0, "watermark": 0.0}
+    ctx = {
+        "in_dir": in_dir, "out_dir": out_dir, "classes": classes, "padding": padding,
+        "blur_kernel": blur_kernel, "circle_scale": circle_scale, "blur_engine": blur_engine,
+        "write_censored": write_censored, "finish": finish, "ort_threads": ort_threads,
+        "cache_path": cache_path, "cache_max": cache_max, "keyed": on_done is not None,
+        "detect_long_edge": detect_long_edge,
+    }
+
+    if backend == "thread" and detect_batch_size and detect_batch_size > 1:
+        _run_censoring_batched(numbered, total, ctx, int(detect_batch_size), workers, stats, on_done)
+    else:
+        if backend == "process":
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_censor_worker,
+                                       initargs=ort_threads)
+        else:
+            _get_nude_detector(*ort_threads)   # build once, before the threads race for it
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool as ex:
+            # at most workers * INFLIGHT_PER_WORKER tasks exist at any time
+            tasks = ((fn, i, ctx) for i, fn in numbered)
+            done = bounded_submit(ex, _censor_one, tasks, workers * INFLIGHT_PER_WORKER)
+            for (fn, _, _), fut in tqdm(done, total=total, desc="🖼️  Censoring images", unit="image"):
+                msg, timings, key, hit = fut.result()
+                _tally(stats, msg, timings)
+                stats["cache_hits"] += hit
+                if not msg and on_done:
+                    on_done(fn, key)
+
+    tqdm.write(
+        "⏱️ Censoring time (worker sum): "
+        f"decode {stats['decode']:.1f}s, detect {stats['detect']:.1f}s, "
+        f"blur {stats['blur']:.1f}s, encode {stats['encode']:.1f}s, "
+        f"watermark {stats['watermark']:.1f}s"
+        + (f" ({stats['cache_hits']} cached detections)" if cache_path else "")
+    )
+    if cache_path:
+        _get_detection_cache(ctx).evict()
+    return stats
 
 
 # ======================= STAGE 3: OPTIMIZE + WATERMARK =======================
 # (merged from your image_optimizer.py)
 
+def _fit_size(width, height, max_width, max_height):
+    """Proportional scaling: landscape is bounded by max_width, portrait by max_height."""
+    if width > height:
+        if width > max_width:
+            height = int((max_width / width) * height)
+            width = max_width
+    else:
+        if height > max_height:
+            width = int((max_height / height) * width)
+            height = max_height
+    return width, height
+
+
 def optimize_image(input_path, output_path, max_width, max_height, quality):
     """Resize proportionally and save as JPEG."""
     with Image.open(input_path) as img:
-        width, height = img.size
-
-        # Proportional scaling
-        if width > height:
-            if width > max_width:
-                height = int((max_width / width) * height)
-                width = max_width
-        else:
-            if height > max_height:
-                width = int((max_height / height) * width)
-                height = max_height
-
+        width, height = _fit_size(*img.size, max_width, max_height)
         img = img.resize((width, height), RESAMPLE).convert("RGB")
         img.save(output_path, "JPEG", quality=int(quality), optimize=True)
 
 
-def add_watermark(input_path, watermark_path, watermark_land_path,
-                  output_path, opacity=0.5, quality=100):
-    """Center watermark (portrait/landscape auto) and save JPEG."""
-    base_img = Image.open(input_path).convert("RGBA")
-    width, height = base_img.size
+def _scaled_watermark(watermark_path, target_width, opacity):
+    """
+    Watermark scaled to `target_width` with opacity applied, cropped to the
+    bounding rectangle of its visible pixels.
+
+    Returns (rgb uint8 HxWx3, alpha uint8 HxWx1, off_x, off_y, full_h); uint8 keeps
+    a 3800px-wide mark at ~19 MB, _blend_watermark widens it per blend.
+    Cached per (brand path, target width, opacity), LRU, up to _WM_CACHE_BYTES;
+    a shoot usually has 2-3 sizes.
+    """
+    key = (watermark_path, target_width, opacity)
+    with _wm_cache_lock:
+        entry = _wm_cache.get(key)
+        if entry is not None:
+            _wm_cache.move_to_end(key)
+            return entry
+    entry = _load_scaled_watermark(watermark_path, target_width, opacity)
+    with _wm_cache_lock:
+        _wm_cache[key] = entry
+        total = sum(e[0].nbytes + e[1].nbytes for e in _wm_cache.values())
+        while total > _WM_CACHE_BYTES and len(_wm_cache) > 1:
+            _, old = _wm_cache.popitem(last=False)
+            total -= old[0].nbytes + old[1].nbytes
+    return entry
+
+
+def _load_scaled_watermark(watermark_path, target_width, opacity):
+    with Image.open(watermark_path) as wm:
+        wm = wm.convert("RGBA")
+        new_h = int((target_width / wm.width) * wm.height)
+        wm = wm.resize((target_width, new_h), RESAMPLE)
+    arr = np.asarray(wm)
+
+    # same truncation as point(lambda p: int(p * opacity))
+    alpha = (arr[..., 3] * float(opacity)).astype(np.uint8)
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if rows.size == 0:
+        empty = np.zeros((0, 0, 1), np.uint8)
+        return np.zeros((0, 0, 3), np.uint8), empty, 0, 0, new_h
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+    a = np.ascontiguousarray(alpha[y0:y1, x0:x1, None])
+    rgb = np.ascontiguousarray(arr[y0:y1, x0:x1, :3])
+    rgb.flags.writeable = False
+    a.flags.writeable = False
+    return rgb, a, int(x0), int(y0), new_h
 
-    # Choose watermark orientation
-    wm = Image.open(watermark_land_path if width > height else watermark_path).convert("RGBA")
+
+def _blend_watermark(rgb, watermark_path, watermark_land_path, opacity=0.5):
+    """Alpha-blend the centered (portrait/landscape auto) watermark into an RGB uint8 array, in place."""
+    height, width = rgb.shape[:2]
+    path = watermark_land_path if width > height else watermark_path
 
     # Scale watermark to ~95% of base width
     new_w = int(width * 0.95)
-    new_h = int((new_w / wm.width) * wm.height)
-    wm = wm.resize((new_w, new_h), RESAMPLE)
+    wm_rgb, wm_a, off_x, off_y, new_h = _scaled_watermark(path, new_w, float(opacity))
+
+    # Center position of the full watermark, then of its visible rectangle
+    x = width // 2 - new_w // 2 + off_x
+    y = height // 2 - new_h // 2 + off_y
+    h, w = wm_a.shape[:2]
+
+    # Clip to the canvas (paste() semantics)
+    bx0, by0 = max(x, 0), max(y, 0)
+    bx1, by1 = min(x + w, width), min(y + h, height)
+    if bx0 >= bx1 or by0 >= by1:
+        return rgb
+
+    region = rgb[by0:by1, bx0:bx1]
+    a = wm_a[by0 - y:by1 - y, bx0 - x:bx1 - x]
+    src = wm_rgb[by0 - y:by1 - y, bx0 - x:bx1 - x]
+    # round(region * (1 - a/255) + src * a/255) in integers; the sum is at most
+    # 255 * 255 + 127, so uint16 holds it
+    a = a.astype(np.uint16)
+    mixed = region * (255 - a) + src * a
+    mixed += 127
+    mixed //= 255
+    region[...] = mixed
+    return rgb
+
 
-    # Apply opacity
-    alpha = wm.split()[3].point(lambda p: int(p * float(opacity)))
-    wm.putalpha(alpha)
+def _watermark_image(base_img, watermark_path, watermark_land_path, opacity=0.5):
+    """Return RGB copy of `base_img` with the centered (portrait/landscape auto) watermark."""
+    rgb = np.array(base_img.convert("RGB"))
+    _blend_watermark(rgb, watermark_path, watermark_land_path, opacity)
+    return Image.fromarray(rgb)
+
+
+def add_watermark(input_path, watermark_path, watermark_land_path,
+                  output_path, opacity=0.5, quality=100):
+    """Center watermark (portrait/landscape auto) and save JPEG."""
+    with Image.open(input_path) as base_img:
+        out = _watermark_image(base_img, watermark_path, watermark_land_path, opacity)
+    out.save(output_path, "JPEG", quality=int(quality))
 
-    # Center position
-    pos = (width // 2 - new_w // 2, height // 2 - new_h // 2)
 
-    canvas = Image.new("RGBA", base_img.size)
-    canvas.paste(base_img, (0, 0))
-    canvas.paste(wm, pos, mask=wm)
-    canvas.convert("RGB").save(output_path, "JPEG", quality=int(quality))
+def _finish_in_memory(img_bgr, output_path, watermark_path, watermark_land_path,
+                      max_width, max_height, quality, opacity):
+    """Fused Stage 3: censored BGR array -> resize -> watermark -> one JPEG encode."""
+    img = Image.fromarray(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
+    width, height = _fit_size(*img.size, max_width, max_height)
+    if (width, height) != img.size:
+        img = img.resize((width, height), RESAMPLE)
+    img = _watermark_image(img, watermark_path, watermark_land_path, opacity)
+    img.save(output_path, "JPEG", quality=int(quality), optimize=True)
 
 
 def _wm_one(index, filename, folder_path, output_folder,
@@ -218,33 +753,95 @@ def _wm_one(index, filename, folder_path, output_folder,
         add_watermark(tmp_path, watermark_path, watermark_land_path, out_path, opacity, quality)
         os.remove(tmp_path)
         # print(f"Processed: {in_path} -> {out_path}")
+        return True
     except Exception as e:
         print(f"Failed to process {in_path}: {e}")
+        return False
 
 
 def optimize_images_in_folder(folder_path, output_folder,
                               watermark_path, watermark_land_path,
-                              max_width, max_height, quality, opacity=0.5):
-    """Batch optimize + watermark."""
+                              max_width, max_height, quality, opacity=0.5,
+                              items=None, on_done=None):
+    """
+    Batch optimize + watermark.
+    items: optional [(index, filename)] instead of numbering every image of the folder;
+    on_done(filename) is called for every file written successfully.
+    """
+    from tqdm import tqdm
+
     os.makedirs(output_folder, exist_ok=True)
-    exts = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.gif')
-    files = [f for f in os.listdir(folder_path) if os.path.splitext(f)[1].lower() in exts]
-
-    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
-        futures = [
-            ex.submit(
-                _wm_one, i, fn, folder_path, output_folder,
-                watermark_path, watermark_land_path,
-                max_width, max_height, quality, opacity
-            )
-            for i, fn in enumerate(files, start=1)
-        ]
-        for _ in tqdm(as_completed(futures), total=len(files), desc="💧 Watermarking", unit="img"):
-            pass
+    if items is None:
+        exts = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.gif')
+
+        def files():
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if os.path.splitext(entry.name)[1].lower() in exts:
+                        yield entry.name
+
+        total = sum(1 for _ in files())
+        items = enumerate(files(), start=1)
+    else:
+        items = list(items)
+        total = len(items)
+
+    workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        tasks = (
+            (i, fn, folder_path, output_folder,
+             watermark_path, watermark_land_path,
+             max_width, max_height, quality, opacity)
+            for i, fn in items
+        )
+        done = bounded_submit(ex, _wm_one, tasks, workers * INFLIGHT_PER_WORKER)
+        for args, fut in tqdm(done, total=total, desc="💧 Watermarking", unit="img"):
+            if fut.result() and on_done:
+                on_done(args[1])
 
     return output_folder
 
 
+# ======================= INCREMENTAL RUNS =======================
+
+_MANIFEST_NAME = ".blur_master_manifest.jsonl"
+
+
+def _plan_incremental(in_dir, manifest, params, outputs_of):
+    """
+    Split the images of `in_dir` into work and unchanged files using the run manifest.
+
+    A file is unchanged when the manifest says it finished with the same `params`,
+    its size matches, its mtime matches (or only the mtime moved and the content
+    hash still matches) and its outputs (`outputs_of(filename, index)`) still exist.
+    Known files keep their output number; new files are numbered after the highest.
+
+    Returns (items [(index, filename)], {filename: os.stat_result}, skipped count).
+    """
+    next_index = max((e.get("index", 0) for e in manifest.entries.values()), default=0) + 1
+    items, input_stats, skipped = [], {}, 0
+    for fn in _list_images(in_dir):
+        path = os.path.join(in_dir, fn)
+        st = os.stat(path)
+        entry = manifest.get(fn)
+        if entry is None:
+            index, next_index = next_index, next_index + 1
+        else:
+            index = entry["index"]
+            if (entry.get("params") == params and entry.get("size") == st.st_size
+                    and all(os.path.exists(p) for p in outputs_of(fn, index))):
+                if entry.get("mtime") == st.st_mtime_ns:
+                    skipped += 1
+                    continue
+                if entry.get("hash") == content_key(np.fromfile(path, dtype=np.uint8)):
+                    manifest.record(fn, **{**entry, "mtime": st.st_mtime_ns})  # touched only
+                    skipped += 1
+                    continue
+        items.append((index, fn))
+        input_stats[fn] = st
+    return items, input_stats, skipped
+
+
 # ======================= PUBLIC PIPELINE =======================
 
 def run_blur_master(
@@ -257,6 +854,15 @@ def run_blur_master(
     blur_kernel_size: int = _BLUR_KERNEL_SIZE,
     padding: int = _PADDING if False else _PADDING,   # keep IDEs happy
     circle_radius_scale: float = _CIRCLE_RADIUS_SCALE,
+    blur_engine: str = "gaussian",   # "gaussian" (exact) | "box" | "downscale", see image.ops
+    detect_batch_size: int = _DETECT_BATCH_SIZE,   # >1 -> batched NudeNet inference
+    detect_long_edge: int | None = None,   # e.g. 1280 -> detect on a proxy, blur at full res
+    censor_backend: str = "thread",     # "thread" | "process" (detector per worker)
+    censor_workers: int | None = None,  # None -> cpu_count (thread) / split_cores() (process)
+    ort_intra_threads: int = 0,         # 0 -> onnxruntime default / split_cores() (process)
+    ort_inter_threads: int = 0,
+    detection_cache: str | bool | None = None,   # True -> ~/.cache/mediatool/detections.sqlite
+    detection_cache_max: int = DEFAULT_MAX_ENTRIES,
     # watermark:
     watermark_brand: str | None = "JinXGirl",  # None/"" -> skip Stage 3
     watermark_sets: dict | None = None,
@@ -264,6 +870,11 @@ def run_blur_master(
     max_height: int = 4000,
     img_quality: int = 80,
     wm_opacity: float = 0.7,
+    # fused Stage 2 + 3:
+    fuse_watermark: bool = False,   # censored array -> resize + watermark in memory
+    write_censored: bool = True,    # False -> no CENSORED copy (needs fuse_watermark)
+    # resumable runs:
+    incremental: bool = False,      # skip inputs a previous run already finished
 ):
     """
     Full pipeline:
@@ -271,12 +882,29 @@ def run_blur_master(
       2) censor with NudeNet + circular Gaussian blur
       3) (optional) optimize + add watermark
 
-    Returns dict: {input_used, censored_folder, watermarked_folder}
+    With fuse_watermark=True (and a watermark_brand) stage 3 runs inside stage 2
+    on the censored array: no CENSORED re-read, no tmp_* file, one JPEG encode.
+
+    With incremental=True a run manifest (<parent>/.blur_master_manifest.jsonl)
+    records every finished input (size, mtime, content hash, output number, settings);
+    re-runs only process new/changed files, keep output numbers and leave finished
+    outputs untouched. Changing any setting redoes everything (same numbers).
+
+    Returns dict: {input_used, censored_folder, watermarked_folder, censor_stats,
+    skipped_unchanged} (censored_folder is None when write_censored=False)
     """
     _init_tf()
     classes_to_check = classes_to_check or NUDENET_CLASSES
     wm_sets = watermark_sets or WATERMARK_SETS
 
+    if watermark_brand and watermark_brand not in wm_sets:
+        raise ValueError(f"Unknown watermark brand: {watermark_brand}")
+    if blur_engine not in BLUR_ENGINES:
+        raise ValueError(f"Unknown blur engine: {blur_engine}")
+    fused = bool(watermark_brand) and fuse_watermark
+    if not write_censored and not fused:
+        raise ValueError("write_censored=False needs fuse_watermark=True and a watermark_brand.")
+
     # --- Stage 1: copy (optional) ---
     if enable_photo_copying:
         if not PhotoCopier:
@@ -294,21 +922,92 @@ def run_blur_master(
         folder_to_process = source_directory
 
     # --- Stage 2: censor ---
+    if censor_backend == "process" and not (censor_workers and ort_intra_threads):
+        w, intra = split_cores(workers=censor_workers, intra=ort_intra_threads)
+        censor_workers = censor_workers or w
+        ort_intra_threads = ort_intra_threads or intra
     parent = os.path.abspath(os.path.join(folder_to_process, os.pardir))
     censored = os.path.join(parent, "CENSORED")
-    _run_censoring(
+    wm_out = os.path.join(parent, "WATERMARK_DEMO")
+    finish = None
+    if fused:
+        wm = wm_sets[watermark_brand]
+        finish = {
+            "output_folder": wm_out,
+            "prefix": os.path.basename(censored),   # same names as the two-pass path
+            "watermark_path": wm["port"],
+            "watermark_land_path": wm["land"],
+            "max_width": max_width,
+            "max_height": max_height,
+            "quality": img_quality,
+            "opacity": wm_opacity,
+        }
+
+    items = manifest = stage2_done = None
+    skipped = 0
+    hashes = {}
+    if incremental:
+        manifest = RunManifest(os.path.join(parent, _MANIFEST_NAME))
+        wm = wm_sets[watermark_brand] if watermark_brand else None
+        params = fingerprint({
+            "classes": sorted(classes_to_check), "blur_kernel": blur_kernel_size,
+            "padding": padding, "circle_scale": circle_radius_scale, "blur_engine": blur_engine,
+            "detect_long_edge": detect_long_edge,
+            "write_censored": write_censored, "fused": fused,
+            "watermark": wm and [wm["port"], wm["land"], max_width, max_height, img_quality, wm_opacity],
+        })
+        prefix = os.path.basename(censored)
+
+        def outputs_of(fn, index):
+            out = [os.path.join(censored, fn)] if write_censored else []
+            if watermark_brand:
+                out.append(os.path.join(wm_out, f"{prefix}_{index}.jpg"))
+            return out
+
+        items, input_stats, skipped = _plan_incremental(folder_to_process, manifest, params, outputs_of)
+        index_of = {fn: i for i, fn in items}
+
+        def record(fn, key=None):
+            st = input_stats[fn]
+            manifest.record(fn, index=index_of[fn], size=st.st_size, mtime=st.st_mtime_ns,
+                            hash=key or hashes.get(fn), params=params)
+
+        def remember(fn, key):
+            hashes[fn] = key
+
+        # two-pass mode: an input is finished only once Stage 3 wrote it
+        stage2_done = remember if (watermark_brand and not fused) else record
+        from tqdm import tqdm
+        tqdm.write(f"♻️ Incremental: {len(items)} to process, {skipped} unchanged")
+
+    censor_stats = _run_censoring(
         folder_to_process, censored,
-        classes_to_check, padding, blur_kernel_size, circle_radius_scale
+        classes_to_check, padding, blur_kernel_size, circle_radius_scale,
+        detect_batch_size=detect_batch_size,
+        finish=finish,
+        write_censored=write_censored,
+        blur_engine=blur_engine,
+        backend=censor_backend,
+        workers=censor_workers,
+        ort_threads=(ort_intra_threads, ort_inter_threads),
+        cache_path=default_cache_path() if detection_cache is True else (detection_cache or None),
+        cache_max=detection_cache_max,
+        items=items,
+        on_done=stage2_done,
+        detect_long_edge=detect_long_edge,
     )
 
-    result = {"input_used": folder_to_process, "censored_folder": censored, "watermarked_folder": None}
+    result = {
+        "input_used": folder_to_process,
+        "censored_folder": censored if write_censored else None,
+        "watermarked_folder": wm_out if fused else None,
+        "censor_stats": censor_stats,
+        "skipped_unchanged": skipped,
+    }
 
     # --- Stage 3: optimize + watermark (optional) ---
-    if watermark_brand:
-        if watermark_brand not in wm_sets:
-            raise ValueError(f"Unknown watermark brand: {watermark_brand}")
+    if watermark_brand and not fused:
         wm = wm_sets[watermark_brand]
-        wm_out = os.path.join(parent, "WATERMARK_DEMO")
         optimize_images_in_folder(
             folder_path=censored,
             output_folder=wm_out,
@@ -317,8 +1016,13 @@ def run_blur_master(
             max_width=max_width,
             max_height=max_height,
             quality=img_quality,
-            opacity=wm_opacity
+            opacity=wm_opacity,
+            items=[(i, fn) for i, fn in items if fn in hashes] if incremental else None,
+            on_done=record if incremental else None,
         )
         result["watermarked_folder"] = wm_out
 
+    if manifest is not None:
+        manifest.compact()
+        manifest.close()
     return result
@@ -1,18 +1,172 @@
 # src/mediatool/image/pipelines/blur_script_interactive.py
 from __future__ import annotations
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Optional, Iterable
 from PIL import Image, ImageFilter
+from mediatool.image.ops import fast_blur
+from mediatool.utils.concurrency import INFLIGHT_PER_WORKER, bounded_submit
+from mediatool.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
 
 SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tiff", ".webp"}
 
+# Quick Blur engines. Worst pixel error vs. "exact" in 8-bit levels, measured on
+# 8 photos (4000x3000) at radius 12..150:
+#   "exact"      Pillow GaussianBlur on the full image (reference, the old behaviour)
+#   "box"        3 stacked OpenCV box filters (image.ops.fast_blur), <= 4. ~2x faster
+#                per image, decode included (1.8-2.6x on 12 MP JPEGs, one core)
+#   "downscale"  box-shrink until the blur radius is a few px, blur, bilinear upscale.
+#                With reduced_decode a JPEG is DCT-decoded at 1/2..1/8 size instead of
+#                shrinking a full decode. Error depends on the radius left on the small
+#                image; the worst pixels sit within ~radius of the image edges (the
+#                interior stays <= 6).
+QUICK_BLUR_ENGINES = ("exact", "box", "downscale")
+_BOX_MAX_ERROR = 4
+_DOWNSCALE_ERROR = ((2, 37), (3, 22), (4, 19), (6, 15), (8, 12))   # (radius on small image, worst error)
+_DOWNSCALE_RADIUS = 4   # used when no max_error is given
+
+
+def _resolve_engine(engine: str, radius: float, max_error: Optional[int]):
+    """
+    (engine, radius kept on the shrunk image or None) that honours max_error: the
+    downscale engine shrinks as far as its measured error allows and otherwise falls
+    back to box, box falls back to exact.
+    """
+    if engine not in QUICK_BLUR_ENGINES:
+        raise ValueError(f"Unknown Quick Blur engine: {engine} (expected one of {QUICK_BLUR_ENGINES})")
+    if engine == "downscale":
+        if max_error is None:
+            small_radius = _DOWNSCALE_RADIUS
+        else:
+            small_radius = next((r for r, err in _DOWNSCALE_ERROR if err <= max_error), None)
+        if small_radius and radius / small_radius >= 2:
+            return "downscale", small_radius
+        engine = "box"
+    if engine == "box" and (max_error is None or max_error >= _BOX_MAX_ERROR):
+        return "box", None
+    return "exact", None
+
+
+def _filterable(im: Image.Image) -> Image.Image:
+    if im.mode in ("L", "LA", "RGB", "RGBA"):
+        return im
+    return im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+
+
+def _blur_image(src: Path, radius: float, engine: str = "exact", small_radius: Optional[float] = None,
+                reduced_decode: bool = True, timings: Optional[dict] = None) -> Image.Image:
+    """
+    Decode `src` and blur it with a resolved engine (see _resolve_engine); same size
+    out. timings, if given, receives "decode" and "filter" seconds.
+    """
+    t0 = time.perf_counter()
+    with Image.open(src) as im:
+        size = im.size
+        small = None
+        if engine == "downscale":
+            small = (max(1, round(size[0] * small_radius / radius)), max(1, round(size[1] * small_radius / radius)))
+            if reduced_decode:
+                im.draft(im.mode, small)   # JPEG only: decodes at >= `small`, no-op otherwise
+        im.load()
+        t1 = time.perf_counter()
+        if timings is not None:
+            timings["decode"] = t1 - t0
+        out = _filter(im, size, radius, engine, small)
+        if timings is not None:
+            timings["filter"] = time.perf_counter() - t1
+        return out
+
+
+def _filter(im: Image.Image, size, radius: float, engine: str, small=None) -> Image.Image:
+    """Blur a decoded image back to `size`; `small` is the downscale engine's work size."""
+    if engine == "exact":
+        return im.filter(ImageFilter.GaussianBlur(radius=radius))
+    if engine == "box":
+        arr = fast_blur(np.asarray(_filterable(im)), 0, "box", sigma=radius, border=cv2.BORDER_REPLICATE)
+        return Image.fromarray(arr)
+    im = _filterable(im).resize(small, Image.BOX)
+    im = im.filter(ImageFilter.GaussianBlur(radius=radius * small[0] / size[0]))
+    # the full-size upscale dominates this engine; OpenCV's is ~2x Pillow's
+    return Image.fromarray(cv2.resize(np.asarray(im), size, interpolation=cv2.INTER_LINEAR))
+
+
+class _Progress:
+    """
+    Merges per-file completions from any worker thread. Counts, stage seconds and
+    the progress(done, total, name) callback all happen under one lock, so the
+    caller sees `done` strictly increasing, once per file.
+    """
+
+    def __init__(self, callback, total: int):
+        self.callback = callback
+        self.total = total
+        self.processed = self.failed = 0
+        self.timings = {"decode": 0.0, "filter": 0.0, "encode": 0.0}
+        self._lock = threading.Lock()
+
+    def finish(self, name: str, ok: bool, timings: dict) -> None:
+        with self._lock:
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+            for stage, seconds in timings.items():
+                self.timings[stage] += seconds
+            if self.callback:
+                self.callback(self.processed + self.failed, self.total, name)
+
+
+def _blur_one(src: Path, out_path: Path, radius, engine, small_radius, reduced_decode, tracker: _Progress):
+    timings = {}
+    ok = False
+    try:
+        blurred = _blur_image(src, radius, engine, small_radius, reduced_decode, timings)
+        t0 = time.perf_counter()
+        dst = out_path / src.name
+        if dst.suffix.lower() in {".jpg", ".jpeg"} and blurred.mode in ("RGBA", "LA", "P"):
+            blurred = blurred.convert("RGB")
+        blurred.save(dst)
+        timings["encode"] = time.perf_counter() - t0
+        ok = True
+    except Exception as e:
+        print(f"[quick-blur] failed {src}: {e}")
+    tracker.finish(src.name, ok, timings)
+
+
 def blur_folder(
     input_folder: str | Path,
     radius: int = 78,
     output_folder: Optional[str | Path] = None,
     progress: Optional[Callable[[int, int, str | None], None]] = None,
     files: Optional[Iterable[str | Path]] = None,   # <-- NEW
+    engine: str = "exact",
+    max_error: Optional[int] = None,
+    reduced_decode: bool = True,
+    workers: Optional[int] = 1,
 ):
+    """
+    Gaussian-blur every image into the output folder (same names, same sizes).
+
+    engine: "exact" | "box" | "downscale", see QUICK_BLUR_ENGINES. max_error: worst
+    per-channel deviation from "exact" you accept (8-bit levels); an engine that
+    cannot promise it falls back to a more exact one. reduced_decode: let the
+    downscale engine decode JPEGs at reduced size.
+
+    workers: files blurred at once on a thread pool (Pillow and OpenCV release the
+    GIL while decoding, filtering and encoding); None = cpu_count, 1 = in this
+    thread. Each worker holds one decoded image. progress(done, total, name) is
+    called once per finished file, from whichever thread finished it.
+
+    The summary adds "seconds" (wall), "workers" and "timings": decode / filter /
+    encode seconds summed over files (more than the wall time when workers > 1).
+    """
+    engine, small_radius = _resolve_engine(engine, radius, max_error)
     in_path = Path(input_folder).expanduser().resolve()
     if not in_path.exists():
         raise ValueError(f"Path not found: {in_path}")
@@ -32,21 +186,18 @@ def blur_folder(
     if progress:
         progress(0, total, "start")
 
-    processed = failed = 0
-    for i, src in enumerate(file_list, start=1):
-        if progress:
-            progress(i - 1, total, src.name)
-        try:
-            with Image.open(src) as im:
-                blurred = im.filter(ImageFilter.GaussianBlur(radius=radius))
-                dst = out_path / src.name
-                if dst.suffix.lower() in {".jpg", ".jpeg"} and blurred.mode in ("RGBA", "LA", "P"):
-                    blurred = blurred.convert("RGB")
-                blurred.save(dst)
-            processed += 1
-        except Exception as e:
-            print(f"[quick-blur] failed {src}: {e}")
-            failed += 1
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    tracker = _Progress(progress, total)
+    jobs = ((src, out_path, radius, engine, small_radius, reduced_decode, tracker) for src in file_list)
+    t0 = time.perf_counter()
+    if workers == 1:
+        for args in jobs:
+            _blur_one(*args)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for _args, fut in bounded_submit(ex, _blur_one, jobs, workers * INFLIGHT_PER_WORKER):
+                fut.result()
+    seconds = time.perf_counter() - t0
 
     if progress:
         progress(total, total, "done")
@@ -55,7 +206,11 @@ def blur_folder(
         "input": str(in_path),
         "output": str(out_path),
         "total": total,
-        "processed": processed,
-        "failed": failed,
+        "processed": tracker.processed,
+        "failed": tracker.failed,
         "radius": radius,
+        "engine": engine,
+        "workers": workers,
+        "seconds": seconds,
+        "timings": tracker.timings,
     }
@@ -1,45 +1,278 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
+from mediatool.utils.concurrency import INFLIGHT_PER_WORKER, bounded_submit
 from mediatool.utils.logging import get_logger
+from mediatool.utils.manifest import RunManifest, fingerprint
 
 log = get_logger(__name__)
 ALLOWED = {".png", ".jpg", ".jpeg"}
 
-def _convert_one(src: Path, quality=90, png_lossless=True) -> bool:
+# Encoder effort per profile. Lossy: method 0-6. Lossless: method + "effort"
+# (Pillow passes quality as the lossless compression effort, 0-100).
+# Measured on a 2000x1500 photo / a flat graphic (lossy q90):
+#   lossy m2 ~0.4x the time of m4, +0-10% bytes; m6 ~2.5x m4, -10% on photos
+#   lossless m6/effort 100 ~10x m4/effort 80 for <1% fewer bytes
+# "max" is what the converter always used.
+WEBP_PROFILES = {
+    "fast": {"method": 2, "lossless_method": 2, "lossless_effort": 25},
+    "balanced": {"method": 4, "lossless_method": 4, "lossless_effort": 50},
+    "max": {"method": 6, "lossless_method": 4, "lossless_effort": 80},
+}
+_AUTO_TILE = 256            # auto mode samples up to 4 tiles of this size...
+_AUTO_LOSSLESS_SLACK = 1.1  # ...and keeps lossless unless it is >10% bigger than lossy
+_MANIFEST_NAME = ".webp_manifest.jsonl"
+_TMP_SUFFIX = ".webp.tmp"
+
+
+class WebpReport(tuple):
+    """
+    (ok, total) like before, plus:
+      results     per-file dicts {src, dst, ok, lossless, bytes_in, bytes_out, seconds, error}
+      throughput  {seconds, skipped, files_per_s, mb_in, mb_out, mb_in_per_s, mb_out_per_s}
+    """
+
+    def __new__(cls, results, seconds):
+        ok = sum(r["ok"] for r in results)
+        self = super().__new__(cls, (ok, len(results)))
+        self.results = results
+        mb_in = sum(r["bytes_in"] for r in results) / 1e6
+        mb_out = sum(r["bytes_out"] for r in results) / 1e6
+        rate = 1 / seconds if seconds > 0 else 0.0
+        self.throughput = {
+            "seconds": seconds,
+            "skipped": sum(r.get("skipped", False) for r in results),
+            "files_per_s": len(results) * rate,
+            "mb_in": mb_in,
+            "mb_out": mb_out,
+            "mb_in_per_s": mb_in * rate,
+            "mb_out_per_s": mb_out * rate,
+        }
+        return self
+
+
+def _auto_sample(im: Image.Image) -> Image.Image:
+    """
+    Up to four native-resolution tiles (one per quadrant centre) pasted into one
+    small image. Crops rather than a downscale: resampling smooths sensor noise,
+    and noise is exactly what makes lossless large on photos.
+    """
+    w, h = im.size
+    t = _AUTO_TILE
+    if w <= 2 * t or h <= 2 * t:
+        return im
+    sample = Image.new(im.mode, (2 * t, 2 * t))
+    for i, (cx, cy) in enumerate(((w // 4, h // 4), (3 * w // 4, h // 4),
+                                  (w // 4, 3 * h // 4), (3 * w // 4, 3 * h // 4))):
+        tile = im.crop((cx - t // 2, cy - t // 2, cx + t // 2, cy + t // 2))
+        sample.paste(tile, ((i % 2) * t, (i // 2) * t))
+    return sample
+
+
+def _encoded_size(im: Image.Image, **params) -> int:
+    buf = io.BytesIO()
+    im.save(buf, "WEBP", **params)
+    return buf.tell()
+
+
+def _webp_params(lossless: bool, quality: int, profile: dict) -> dict:
+    if lossless:
+        return {"lossless": True, "method": profile["lossless_method"],
+                "quality": profile["lossless_effort"]}
+    return {"quality": int(quality), "method": profile["method"]}
+
+
+def _choose_lossless(im: Image.Image, quality: int, profile: dict) -> bool:
+    """Trial-encode a sample both ways; lossless unless clearly bigger than lossy."""
+    sample = _auto_sample(im)
+    lossless = _encoded_size(sample, **_webp_params(True, quality, profile))
+    lossy = _encoded_size(sample, **_webp_params(False, quality, profile))
+    return lossless <= lossy * _AUTO_LOSSLESS_SLACK
+
+
+def _convert_one(src: Path, quality=90, png_lossless=True, profile="max") -> dict:
+    """
+    Encode to `<dst>.webp.tmp`, then os.replace() onto the .webp: an interrupted run
+    leaves either the old output or the complete new one, never a torn file.
+    """
     ext = src.suffix.lower()
     dst = src.with_suffix(".webp")
+    tmp = dst.with_name(dst.name[:-len(".webp")] + _TMP_SUFFIX)
+    t0 = time.perf_counter()
+    result = _result(src)
+    settings = WEBP_PROFILES[profile]
     try:
+        result["bytes_in"] = src.stat().st_size
         with Image.open(src) as im:
             params = {}
             if im.info.get("exif"):
                 params["exif"] = im.info["exif"]
             if im.mode not in ("RGB", "RGBA"):
                 im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
-            if ext == ".png" and png_lossless:
-                params["lossless"] = True
+            if ext != ".png" or not png_lossless:
+                lossless = False
+            elif png_lossless == "auto":
+                lossless = _choose_lossless(im, quality, settings)
             else:
-                params["quality"] = int(quality)
-                params["method"] = 6
-            if dst.exists():
-                dst.unlink()
-            im.save(dst, "WEBP", **params)
-        if dst.exists() and dst.stat().st_size > 0:
-            src.unlink()
+                lossless = True
+            params.update(_webp_params(lossless, quality, settings))
+            result["lossless"] = lossless
+            im.save(tmp, "WEBP", **params)
+        size = tmp.stat().st_size
+        if size > 0:
+            os.replace(tmp, dst)
+            result["bytes_out"] = size
             log.info("OK %s → %s", src.name, dst.name)
-            return True
+            result.update(dst=str(dst), ok=True, seconds=time.perf_counter() - t0)
+            return result
     except Exception as e:
         log.error("ERR %s → %s", src.name, e)
-    if dst.exists():
-        dst.unlink(missing_ok=True)
-    return False
+        result["error"] = str(e)
+    tmp.unlink(missing_ok=True)
+    result["seconds"] = time.perf_counter() - t0
+    return result
 
-def convert_folder_to_webp(folder: str | Path, recursive=True, quality=90, png_lossless=True):
+
+def _scan(root: Path, recursive: bool):
+    """
+    Yield (DirEntry, relative posix path, output name, output_exists) for convertible
+    files, one os.scandir per folder: no extra stat for the type check, the .webp
+    check is a name lookup in the listing, and no pathlib objects (they dominate a
+    rerun over a few hundred thousand up-to-date files). Temp files left by an
+    interrupted run are removed on the way.
+    """
+    stack = [(str(root), "")]
+    while stack:
+        folder, prefix = stack.pop()
+        with os.scandir(folder) as it:
+            entries = list(it)
+        names = {e.name for e in entries}
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                if recursive:
+                    stack.append((e.path, f"{prefix}{e.name}/"))
+                continue
+            stem, ext = os.path.splitext(e.name)
+            if e.name.endswith(_TMP_SUFFIX):
+                os.unlink(e.path)
+            elif ext.lower() in ALLOWED and e.is_file():
+                out = stem + ".webp"
+                yield e, prefix + e.name, prefix + out, out in names
+
+
+def _result(src, **fields) -> dict:
+    result = {"src": str(src), "dst": None, "ok": False, "lossless": False,
+              "bytes_in": 0, "bytes_out": 0, "seconds": 0.0, "error": None}
+    result.update(fields)
+    return result
+
+
+def convert_folder_to_webp(folder: str | Path, recursive=True, quality=90, png_lossless=True,
+                           workers: int | None = None, profile: str = "max",
+                           incremental: bool = False, delete_source: bool = True):
+    """
+    Convert every PNG/JPEG under `folder` to WebP.
+
+    profile: "fast" | "balanced" | "max" encoder effort, see WEBP_PROFILES.
+    png_lossless: True = PNGs always lossless, False = always lossy (JPEGs are
+    always lossy), "auto" = per PNG, trial-encode a small sample both ways and keep
+    lossless only when it is not clearly bigger (flat graphics yes, photos no).
+
+    workers: encoder processes (default cpu_count, 1 = in this process). Files are
+    streamed from the directory walk into the pool, with at most
+    workers * INFLIGHT_PER_WORKER queued.
+
+    delete_source: remove each source once its .webp is in place (the old behaviour).
+    incremental: `<folder>/.webp_manifest.jsonl` remembers (size, mtime, settings) of
+    every converted source; a source that still matches and whose .webp exists is
+    skipped (or just deleted, if the run that wrote it died before doing so). Outputs
+    are always written to a temp file and renamed into place.
+
+    Returns a WebpReport: unpacks as (ok, total), with .results and .throughput;
+    skipped files count as ok and have "skipped": True.
+    """
+    if profile not in WEBP_PROFILES:
+        raise ValueError(f"Unknown WebP profile: {profile}")
     root = Path(folder)
-    paths = root.rglob("*") if recursive else root.glob("*")
-    total = ok = 0
-    for p in paths:
-        if p.is_file() and p.suffix.lower() in ALLOWED:
-            total += 1
-            if _convert_one(p, quality, png_lossless):
-                ok += 1
-    return ok, total
+    workers = int(workers or os.cpu_count() or 1)
+    params = fingerprint({"quality": quality, "png_lossless": png_lossless, "profile": profile})
+    manifest = RunManifest(root / _MANIFEST_NAME) if incremental else None
+    results = []
+    clashes = []
+    stats = {}     # rel path -> (size, mtime_ns) at scan time
+    present = set()
+    changed = 0    # manifest lines written this run
+
+    def todo():
+        nonlocal changed
+        outputs = set()
+        for entry, rel, rel_out, has_output in _scan(root, recursive):
+            if rel_out in outputs:   # a.jpg + a.png -> a.webp: never let two workers write it
+                clashes.append(Path(entry.path))
+                continue
+            outputs.add(rel_out)
+            st = entry.stat()
+            present.add(rel)
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+            rec = manifest.get(rel) if manifest else None
+            if (has_output and rec and rec.get("params") == params
+                    and (rec.get("size"), rec.get("mtime_ns")) == stats[rel]):
+                if delete_source:
+                    os.unlink(entry.path)
+                    manifest.forget(rel)
+                    changed += 1
+                results.append(_result(entry.path, dst=os.path.join(root, rel_out), ok=True,
+                                       skipped=True, lossless=rec.get("lossless", False),
+                                       bytes_in=st.st_size))
+                continue
+            yield (Path(entry.path), quality, png_lossless, profile)
+
+    def done(args, result):
+        nonlocal changed
+        # record first, then delete: a crash in between leaves a source that the
+        # next incremental run recognises as converted and only deletes
+        results.append(result)
+        if not result["ok"]:
+            return
+        src = args[0]
+        rel = src.relative_to(root).as_posix()
+        changed += 1
+        if manifest:
+            size, mtime_ns = stats[rel]
+            manifest.record(rel, size=size, mtime_ns=mtime_ns, params=params,
+                            lossless=result["lossless"])
+        if delete_source:
+            src.unlink()
+            if manifest:
+                manifest.forget(rel)
+
+    t0 = time.perf_counter()
+    try:
+        if workers <= 1:
+            for args in todo():
+                done(args, _convert_one(*args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                for args, fut in bounded_submit(ex, _convert_one, todo(), workers * INFLIGHT_PER_WORKER):
+                    done(args, fut.result())
+        if manifest:
+            gone = [r for r in manifest.entries if r not in present]
+            for rel in gone:
+                manifest.forget(rel)   # source deleted or renamed since
+            if changed or gone:
+                manifest.compact()
+    finally:
+        if manifest:
+            manifest.close()
+    for p in clashes:
+        log.error("ERR %s → %s already produced by another source", p.name, p.with_suffix(".webp").name)
+        results.append(_result(p, bytes_in=p.stat().st_size, error="output name clash"))
+    report = WebpReport(results, time.perf_counter() - t0)
+    tp = report.throughput
+    log.info("WebP: %d/%d files in %.1fs (%.1f files/s, %.1f MB -> %.1f MB, %d up to date)",
+             report[0], report[1], tp["seconds"], tp["files_per_s"], tp["mb_in"], tp["mb_out"],
+             tp["skipped"])
+    return report
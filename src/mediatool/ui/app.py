@@ -7,19 +7,12 @@ import traceback
 if __package__ in (None, ""):
     import sys, pathlib
     sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))  # .../media-tool/src
-    from mediatool.image.pipelines.convert_webp import convert_folder_to_webp
-    from mediatool.image.pipelines.blur_master import run_blur_master, WATERMARK_SETS
-    from mediatool.image.pipelines.dedupe import copy_images_and_deduplicate
-    from mediatool.image.pipelines.blur_script_interactive import blur_folder
-    from mediatool.video.pipelines.transcode_ffmpeg import transcode_h264
-    from mediatool.video.pipelines.extract_frames import extract_frames
+    from mediatool.image.pipelines.blur_master import WATERMARK_SETS
 else:
-    from ..image.pipelines.convert_webp import convert_folder_to_webp
-    from ..image.pipelines.blur_master import run_blur_master, WATERMARK_SETS
-    from ..image.pipelines.dedupe import copy_images_and_deduplicate
-    from ..image.pipelines.blur_script_interactive import blur_folder
-    from ..video.pipelines.transcode_ffmpeg import transcode_h264
-    from ..video.pipelines.extract_frames import extract_frames
+    from ..image.pipelines.blur_master import WATERMARK_SETS
+# Pipelines are imported inside their action handlers: each pulls in heavy deps
+# (cv2, numpy, imagehash, nudenet, ...) and the window should not wait for them.
+# blur_master itself loads cv2/numpy lazily, so WATERMARK_SETS is cheap.
 
 # High-DPI on Windows
 try:
@@ -372,6 +365,8 @@ class App(tk.Tk):
         self.blur_kernel = tk.IntVar(value=151)
         self.padding = tk.IntVar(value=60)
         self.circle_scale = tk.DoubleVar(value=1.0)
+        self.blur_engine = tk.StringVar(value="gaussian")
+        self.incremental = tk.BooleanVar(value=False)
 
         # Classes
         self.class_vars = {}
@@ -420,6 +415,14 @@ class App(tk.Tk):
             .grid(row=r, column=1, columnspan=3, sticky="ew", padx=(6, 0))
         r += 1
 
+        ttk.Label(p, text="BLUR_ENGINE").grid(row=r, column=0, sticky="w")
+        ttk.Combobox(p, textvariable=self.blur_engine, state="readonly", width=12,
+                     values=["gaussian", "box", "downscale"])\
+            .grid(row=r, column=1, sticky="w", padx=(6, 12))
+        ttk.Checkbutton(p, text="INCREMENTAL (resume)", variable=self.incremental)\
+            .grid(row=r, column=2, columnspan=2, sticky="w")
+        r += 1
+
         ttk.Label(p, text="CLASSES_TO_CHECK").grid(row=r, column=0, sticky="w", pady=(8, 2))
         r += 1
         cls_frame = ttk.Frame(p, style="Card.TFrame")
@@ -527,8 +530,13 @@ class App(tk.Tk):
             return
         def work():
             try:
-                ok, total = convert_folder_to_webp(folder, recursive=True)
-                self.after(0, lambda: messagebox.showinfo("WEBP", f"Converted {ok}/{total} files."))
+                from mediatool.image.pipelines.convert_webp import convert_folder_to_webp
+                report = convert_folder_to_webp(folder, recursive=True)
+                ok, total = report
+                tp = report.throughput
+                msg = (f"Converted {ok}/{total} files.\n"
+                       f"{tp['files_per_s']:.1f} files/s, {tp['mb_in']:.1f} MB → {tp['mb_out']:.1f} MB")
+                self.after(0, lambda m=msg: messagebox.showinfo("WEBP", m))
             except Exception:
                 msg = traceback.format_exc()
                 self.after(0, lambda m=msg: messagebox.showerror("WEBP error", m))
@@ -556,6 +564,7 @@ class App(tk.Tk):
                 k = self.blur_kernel.get()
                 if k % 2 == 0:
                     k += 1
+                from mediatool.image.pipelines.blur_master import run_blur_master
                 result = run_blur_master(
                     source_directory=folder,
                     enable_photo_copying=self.enable_copy.get(),
@@ -565,6 +574,8 @@ class App(tk.Tk):
                     blur_kernel_size=k,
                     padding=int(self.padding.get()),
                     circle_radius_scale=float(self.circle_scale.get()),
+                    blur_engine=self.blur_engine.get(),
+                    incremental=self.incremental.get(),
                     watermark_brand=brand,  # "" -> skip
                     watermark_sets=self.watermark_sets,
                     max_width=int(self.max_width.get()),
@@ -584,16 +595,67 @@ class App(tk.Tk):
         Thread(target=work, daemon=True).start()
 
     def _run_transcode(self):
-        f = filedialog.askopenfilename(title="Pick a video")
-        if not f:
+        files = filedialog.askopenfilenames(title="Pick videos")
+        if not files:
             return
+        from mediatool.video.pipelines.transcode_batch import TranscodeBatch
+
+        prog = tk.Toplevel(self)
+        prog.title("Transcoding…")
+        prog.transient(self)
+        prog.grab_set()
+        prog.resizable(False, False)
+        label = ttk.Label(prog, text=f"0 / {len(files)}")
+        label.grid(row=0, column=0, padx=16, pady=(16, 8))
+        pb = ttk.Progressbar(prog, mode="determinate",
+                             style="Accent.Horizontal.TProgressbar", length=420)
+        pb.grid(row=1, column=0, padx=16, pady=(0, 8))
+        live = ttk.Label(prog, text="", justify="left")
+        live.grid(row=2, column=0, padx=16, pady=(0, 8), sticky="w")
+        running = {}   # file name -> its latest ffmpeg stats line
+
+        def progress(done, total, name=None, stats=None):
+            line = None
+            if stats is not None:
+                line = f"{name}: {stats['speed'] or 0:.2f}x, {stats['fps'] or 0:.0f} fps"
+                if stats["eta"] is not None:
+                    line += f", ETA {stats['eta']:.0f}s"
+
+            def ui():
+                if line is not None:
+                    running[name] = line
+                else:
+                    running.pop(name, None)
+                    label.configure(text=f"{done} / {total}" + (f"  {name}" if done else ""))
+                pb.configure(maximum=max(total, 1))
+                pb["value"] = done
+                live.configure(text="\n".join(running.values()))
+            self.after(0, ui)
+
+        batch = TranscodeBatch(files, progress=progress)
+        ttk.Button(prog, text="Cancel", style="Material.Outlined.TButton",
+                   command=batch.cancel).grid(row=3, column=0, pady=(0, 16))
+        prog.protocol("WM_DELETE_WINDOW", batch.cancel)
+
         def work():
             try:
-                out = transcode_h264(f)
-                self.after(0, lambda o=out: messagebox.showinfo("Transcode", f"Saved: {o}"))
+                results = batch.run()
+                ok = [r for r in results if r["ok"]]
+                failed = [r for r in results if not r["ok"] and not r["cancelled"]]
+                msg = f"Transcoded {len(ok)}/{len(results)} files."
+                if ok:
+                    msg += f"\nSaved next to the inputs, e.g. {ok[0]['output']}"
+                if batch.cancelled:
+                    msg += f"\nCancelled: {sum(r['cancelled'] for r in results)}"
+                for r in failed[:5]:
+                    msg += f"\n\n{r['input']}:\n{r['error']}"
+                show = messagebox.showerror if failed else messagebox.showinfo
+                self.after(0, lambda m=msg: show("Transcode", m))
             except Exception:
                 msg = traceback.format_exc()
                 self.after(0, lambda m=msg: messagebox.showerror("FFmpeg error", m))
+            finally:
+                self.after(0, prog.destroy)
         Thread(target=work, daemon=True).start()
 
     # Quick Blur helpers
@@ -623,13 +685,41 @@ class App(tk.Tk):
         f = filedialog.askopenfilename(title="Pick a video")
         if not f:
             return
+
+        prog = tk.Toplevel(self)
+        prog.title("Extracting frames…")
+        prog.transient(self)
+        prog.grab_set()
+        prog.resizable(False, False)
+        label = ttk.Label(prog, text="Starting ffmpeg…")
+        label.grid(row=0, column=0, padx=16, pady=(16, 8))
+        pb = ttk.Progressbar(prog, mode="determinate",
+                             style="Accent.Horizontal.TProgressbar", length=420)
+        pb.grid(row=1, column=0, padx=16, pady=(0, 16))
+
+        def progress(done, total, stats):
+            text = f"{done} / {total or '?'} frames"
+            if stats["speed"]:
+                text += f"  {stats['speed']:.1f}x"
+            if stats["eta"] is not None and not stats["done"]:
+                text += f"  ETA {stats['eta']:.0f}s"
+
+            def ui():
+                pb.configure(maximum=max(total, done, 1))
+                pb["value"] = done
+                label.configure(text=text)
+            self.after(0, ui)
+
         def work():
             try:
-                out = extract_frames(f, fps=1)
+                from mediatool.video.pipelines.extract_frames import extract_frames
+                out = extract_frames(f, fps=1, progress=progress)
                 self.after(0, lambda o=out: messagebox.showinfo("Frames", f"Frames in: {o}"))
             except Exception:
                 msg = traceback.format_exc()
                 self.after(0, lambda m=msg: messagebox.showerror("FFmpeg error", m))
+            finally:
+                self.after(0, prog.destroy)
         Thread(target=work, daemon=True).start()
 
     def _run_dedupe(self):
@@ -656,6 +746,7 @@ class App(tk.Tk):
 
         def work():
             try:
+                from mediatool.image.pipelines.dedupe import copy_images_and_deduplicate
                 summary = copy_images_and_deduplicate(folder, progress=progress)
                 msg = (
                     f"Scanned: {summary['total_scanned']}\n"
@@ -689,19 +780,24 @@ class App(tk.Tk):
 
         def work():
             try:
+                from mediatool.image.pipelines.blur_script_interactive import blur_folder
                 summary = blur_folder(
                     input_folder=input_path or (files[0] if files else ""),
                     radius=int(self.qb_radius.get()),
                     output_folder=(self.qb_out.get().strip() or None),
                     progress=progress,
-                    files=files
+                    files=files,
+                    workers=None,
                 )
+                t = summary["timings"]
                 msg = (f"Input: {summary['input']}\n"
                        f"Output: {summary['output']}\n"
                        f"Images found: {summary['total']}\n"
                        f"Processed: {summary['processed']}\n"
                        f"Failed: {summary['failed']}\n"
-                       f"Radius: {summary['radius']}")
+                       f"Radius: {summary['radius']}\n"
+                       f"Time: {summary['seconds']:.1f}s on {summary['workers']} workers "
+                       f"(decode {t['decode']:.1f}s / filter {t['filter']:.1f}s / encode {t['encode']:.1f}s)")
                 self.after(0, lambda m=msg: messagebox.showinfo("Quick Blur", m))
             except Exception:
                 err = traceback.format_exc()
@@ -0,0 +1,53 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator
+
+INFLIGHT_PER_WORKER = 2   # default window = workers * this
+
+
+def bounded_submit(ex, fn: Callable, items: Iterable[tuple], window: int) -> Iterator:
+    """
+    Streaming executor.map with backpressure: submits fn(*args) for each args tuple
+    pulled lazily from `items`, keeps at most `window` futures in flight and
+    yields (args, future) in completion order. Peak memory is bounded by the
+    window, not by the length of `items`; the consumer's own work between yields
+    throttles submission.
+    """
+    it = iter(items)
+    pending = {}
+
+    def fill():
+        while len(pending) < window:
+            try:
+                args = next(it)
+            except StopIteration:
+                return
+            pending[ex.submit(fn, *args)] = args
+
+    fill()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            yield pending.pop(fut), fut
+        fill()
+
+
+def ordered_submit(ex, fn: Callable, items: Iterable[tuple], window: int) -> Iterator:
+    """
+    Like bounded_submit, but yields (args, future) in submission order, with up to
+    `window` later tasks queued or running behind the one being consumed. Use it when
+    the consumer's decisions depend on input order (first-seen-wins and the like);
+    the caller waits on each yielded future itself.
+    """
+    it = iter(items)
+    pending = deque()
+    for args in it:
+        pending.append((args, ex.submit(fn, *args)))
+        if len(pending) >= window:
+            break
+    while pending:
+        head = pending.popleft()
+        for args in it:   # refill one slot before handing out the head
+            pending.append((args, ex.submit(fn, *args)))
+            break
+        yield head
@@ -0,0 +1,30 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module (cv2, numpy, ...) that imports it on first
+    attribute access. importlib's own per-module locks make the first access
+    safe from several threads at once; a missing package raises the usual
+    ImportError at that point instead of at program start.
+    """
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        mod = self._lazy_module
+        if mod is None:
+            mod = self._lazy_module = importlib.import_module(self._lazy_name)
+        return getattr(mod, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """The module itself if it is already imported, else a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+
+
+def fingerprint(obj) -> str:
+    """Short stable hash of JSON-able parameters (dict key order does not matter)."""
+    raw = json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def _ends_with_newline(path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class RunManifest:
+    """
+    Append-only JSONL manifest of finished inputs: {"name": ..., **fields} per line,
+    the last line for a name wins. Every record() is appended + flushed, so a crash
+    loses at most the line being written; compact() rewrites one line per name.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    name = rec.pop("name", None)
+                    if name is None:
+                        continue
+                    if rec.get("deleted"):
+                        self.entries.pop(name, None)
+                    else:
+                        self.entries[name] = rec
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        if self._fh.tell() and not _ends_with_newline(self.path):
+            self._fh.write("\n")  # don't glue new records onto a torn line
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def record(self, name, **fields):
+        self.entries[name] = fields
+        self._fh.write(json.dumps({"name": name, **fields}) + "\n")
+        self._fh.flush()
+
+    def forget(self, name):
+        if self.entries.pop(name, None) is not None:
+            self._fh.write(json.dumps({"name": name, "deleted": True}) + "\n")
+            self._fh.flush()
+
+    def compact(self):
+        """Rewrite the file with one line per live entry (atomic replace)."""
+        self._fh.close()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for name, fields in self.entries.items():
+                f.write(json.dumps({"name": name, **fields}) + "\n")
+        os.replace(tmp, self.path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self._fh.close()
@@ -1,6 +1,67 @@
+import os
+import shutil
+import sys
 from pathlib import Path
 
+# How a file is placed at its destination; every mode except "copy" falls back to
+# a plain copy when the filesystem (or OS, or volume boundary) does not allow it.
+#   copy      shutil.copy2, independent bytes
+#   hardlink  same inode, no extra space; same volume only, edits show in both
+#   reflink   copy-on-write clone (btrfs/XFS/bcachefs FICLONE, APFS clonefile)
+#   symlink   link to the source path; breaks if the source moves
+COPY_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+_FICLONE = 0x40049409   # linux/fs.h: _IOW(0x94, 9, int)
+
+
 def ensure_dir(p: str | Path) -> Path:
     p = Path(p)
     p.mkdir(parents=True, exist_ok=True)
     return p
+
+
+def _reflink(src: str, dst: str) -> None:
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as s, open(dst, "xb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+            except OSError:
+                d.close()
+                os.unlink(dst)
+                raise
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+    else:
+        raise OSError(f"reflink not supported on {sys.platform}")
+    shutil.copystat(src, dst)
+
+
+def materialize(src: str, dst: str, mode: str = "copy") -> str:
+    """
+    Place `src` at `dst` using `mode` (see COPY_MODES); returns the mode actually used.
+    An existing `dst` raises FileExistsError for every mode but "copy" instead of
+    being overwritten by the fallback copy.
+    """
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown copy mode: {mode}")
+    try:
+        if mode == "hardlink":
+            os.link(src, dst)
+            return mode
+        if mode == "reflink":
+            _reflink(src, dst)
+            return mode
+        if mode == "symlink":
+            os.symlink(os.path.abspath(src), dst)
+            return mode
+    except FileExistsError:
+        raise
+    except OSError:
+        pass   # cross-device, unsupported filesystem, missing privilege -> copy
+    shutil.copy2(src, dst)
+    return "copy"
@@ -1 +1,183 @@
 # tiny video helpers (probe duration, fps, etc.) can go here
+from __future__ import annotations
+
+import re
+import subprocess
+import time
+from fractions import Fraction
+from pathlib import Path
+from mediatool.utils.config import FFMPEG_BIN
+from mediatool.utils.logging import get_logger
+
+log = get_logger(__name__)
+
+_TIMEBASE = re.compile(r"^#tb (\d+): (\d+)/(\d+)", re.MULTILINE)
+_NOPTS = -(1 << 63)
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_START = re.compile(r"Duration: .*?, start: (-?\d+(?:\.\d+)?)")
+_VIDEO_FPS = re.compile(r"Stream #.*?Video:.*?(\d+(?:\.\d+)?) (?:fps|tbr)")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def scan_video(path: str | Path) -> dict:
+    """
+    Packet-level facts about the first video stream from one stream-copy pass
+    through ffmpeg's framecrc muxer. Nothing is decoded, so it runs at disk speed,
+    and it needs no ffprobe next to FFMPEG_BIN.
+
+      frames       packet count (one per frame)
+      duration     seconds from the first pts to the end of the last frame
+      keyframes    [(packet index in decode order, pts seconds)] of every keyframe
+      start        first video pts, seconds, as the container stores it
+      audio_start  first pts of the first audio stream, same clock (None: no audio)
+    """
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", str(path),
+           "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy", "-f", "framecrc", "-"]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    tbs = {int(m[1]): Fraction(int(m[2]), int(m[3])) for m in _TIMEBASE.finditer(out)}
+    if 0 not in tbs:
+        raise RuntimeError(f"No video stream in {path}")
+    tb = tbs[0]
+    frames = 0
+    start = end = audio_start = None
+    keys = []
+    # "stream, dts, pts, duration, size, crc[, F=0x<flags>][, S=...]";
+    # F= is only written when the flags are anything but "keyframe"
+    for line in out.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        fields = [f.strip() for f in line.split(",")]
+        pts, dur = int(fields[2]), int(fields[3])
+        if fields[0] != "0":   # audio: only its first timestamp matters
+            if pts != _NOPTS and (audio_start is None or pts * tbs[1] < audio_start):
+                audio_start = pts * tbs[1]
+            continue
+        flags = next((int(f[2:], 0) for f in fields[6:] if f.startswith("F=")), 1)
+        if pts != _NOPTS:
+            start = pts if start is None else min(start, pts)
+            end = pts + dur if end is None else max(end, pts + dur)
+            if flags & 1:
+                keys.append((frames, pts))
+        frames += 1
+    start = start or 0
+    return {
+        "frames": frames,
+        "duration": float((end - start) * tb) if end is not None else 0.0,
+        "keyframes": [(i, float((pts - start) * tb)) for i, pts in keys],
+        "start": float(start * tb),
+        "audio_start": float(audio_start) if audio_start is not None else None,
+    }
+
+
+def probe(path: str | Path) -> dict:
+    """
+    {"duration": seconds, "fps": first video stream's frame rate, "start": the
+    container's start time, seconds, which ffmpeg subtracts on input} from the header
+    ffmpeg prints for `-i` alone (nothing is read past the header); None where the
+    container does not say.
+    """
+    # ffmpeg exits 1 here ("At least one output file must be specified")
+    err = subprocess.run([FFMPEG_BIN, "-hide_banner", "-i", str(path)],
+                         capture_output=True, text=True, errors="replace", check=False).stderr
+    d = _DURATION.search(err)
+    f = _VIDEO_FPS.search(err)
+    s = _START.search(err)
+    return {
+        "duration": int(d[1]) * 3600 + int(d[2]) * 60 + float(d[3]) if d else None,
+        "fps": float(f[1]) if f else None,
+        "start": float(s[1]) if s else None,
+    }
+
+
+def _number(value):
+    """"923.7kbits/s" -> 923.7, " 4.2x" -> 4.2, "N/A" -> None."""
+    m = _NUMBER.search(value or "")
+    return float(m[0]) if m else None
+
+
+def progress_stats(block: dict, duration, elapsed: float) -> dict:
+    """
+    One `-progress` block (key -> value, up to its progress= line) as the stats
+    dict run_ffmpeg reports; eta needs the input `duration`.
+    """
+    out_time = _number(block.get("out_time_us"))
+    out_time = max(out_time, 0.0) / 1e6 if out_time is not None else None
+    speed = _number(block.get("speed"))
+    eta = None
+    if duration and out_time is not None and speed:
+        eta = max(duration - out_time, 0.0) / speed
+    return {
+        "frame": int(_number(block.get("frame")) or 0),
+        "fps": _number(block.get("fps")),
+        "speed": speed,
+        "bitrate_kbps": _number(block.get("bitrate")),
+        "size_bytes": int(_number(block.get("total_size")) or 0),
+        "out_time": out_time,
+        "elapsed": elapsed,
+        "eta": eta,
+        "done": False,
+    }
+
+
+def final_stats(frames: int, seconds: float, out_time, size_bytes: int, bitrate_kbps=None) -> dict:
+    """The closing progress record: same keys as the live ones, averaged over the run."""
+    rate = 1 / seconds if seconds > 0 else 0.0
+    if bitrate_kbps is None and out_time and size_bytes:   # image2 etc. report no size
+        bitrate_kbps = size_bytes * 8 / out_time / 1000
+    stats = {
+        "frame": frames,
+        "fps": frames * rate,
+        "speed": (out_time or 0.0) * rate,
+        "bitrate_kbps": bitrate_kbps,
+        "size_bytes": size_bytes,
+        "out_time": out_time,
+        "elapsed": seconds,
+        "eta": 0.0,
+        "done": True,
+    }
+    log.info("ffmpeg stats: %d frames in %.1fs (%.1f fps, %.2fx realtime, %s kbit/s, %.1f MB)",
+             frames, seconds, stats["fps"], stats["speed"],
+             "n/a" if bitrate_kbps is None else f"{bitrate_kbps:.0f}", size_bytes / 1e6)
+    return stats
+
+
+def run_ffmpeg(cmd: list[str], progress=None, duration: float | None = None, frames: int | None = None) -> dict:
+    """
+    subprocess.run(cmd, check=True) for an ffmpeg command, reading ffmpeg's
+    machine-readable `-progress` stream from its stdout. The console stats line is
+    switched off; the log still goes to stderr.
+
+    progress(frames done, frames expected, stats) is called on every report, about
+    twice a second. Frames expected is `frames`, or 0 when unknown. stats holds
+    frame, fps, speed (x realtime), bitrate_kbps, size_bytes, out_time (s of
+    output written), elapsed, eta (s; needs `duration`, None until ffmpeg
+    reports a speed) and done. After a successful exit there is one more call
+    with the final record (see final_stats), where done is True and expected
+    equals done. That record is also returned and logged.
+    """
+    full = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    expected = frames or 0
+    log.info("Running: %s", " ".join(full))
+    t0 = time.perf_counter()
+    block = {}
+    last = {}
+    with subprocess.Popen(full, stdout=subprocess.PIPE, text=True, errors="replace") as proc:
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+            last = block
+            block = {}
+            if progress and value != "end":
+                stats = progress_stats(last, duration, time.perf_counter() - t0)
+                progress(stats["frame"], max(expected, stats["frame"]) if expected else 0, stats)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, full)
+
+    stats = progress_stats(last, duration, 0.0)
+    final = final_stats(stats["frame"], time.perf_counter() - t0, stats["out_time"], stats["size_bytes"],
+                        stats["bitrate_kbps"])
+    if progress:
+        progress(final["frame"], final["frame"], final)
+    return final
@@ -1,16 +1,24 @@
-import subprocess
+from __future__ import annotations
+
+from fractions import Fraction
 from pathlib import Path
 from mediatool.utils.config import FFMPEG_BIN
 from mediatool.utils.logging import get_logger
 from mediatool.utils.paths import ensure_dir
+from mediatool.video.ops import probe, run_ffmpeg
 
 log = get_logger(__name__)
 
-def extract_frames(input_path: str | Path, fps=1, out_dir: str | Path | None = None):
+def extract_frames(input_path: str | Path, fps=1, out_dir: str | Path | None = None, progress=None):
+    """
+    progress(frames written, frames expected, stats): live ffmpeg telemetry, then a
+    final record with done=True; see video.ops.run_ffmpeg. Frames expected is
+    estimated from the container's duration (0 when it has none).
+    """
     inp = Path(input_path)
     out_dir = ensure_dir(out_dir or (inp.parent / f"{inp.stem}_frames"))
     pattern = out_dir / "frame_%06d.png"
     cmd = [FFMPEG_BIN, "-y", "-i", str(inp), "-vf", f"fps={fps}", str(pattern)]
-    log.info("Running: %s", " ".join(cmd))
-    subprocess.run(cmd, check=True)
+    duration = probe(inp)["duration"] if progress else None
+    run_ffmpeg(cmd, progress, duration, round(duration * Fraction(str(fps))) if duration else None)
     return out_dir
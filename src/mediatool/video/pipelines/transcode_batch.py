@@ -0,0 +1,185 @@
+# src/mediatool/video/pipelines/transcode_batch.py
+"""
+Batch H.264 transcoding: many inputs, at most `jobs` ffmpeg processes at a time.
+
+One asyncio event loop starts and watches every process, so a batch runs on the
+caller's thread however many files it has (on Python < 3.12 asyncio's default
+child watcher adds a small waiter thread per *running* process). Each ffmpeg gets an explicit -threads
+share of the cores (jobs * threads ~ cpu_count) instead of every process sizing
+its decoder and encoder pools for the whole machine.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from subprocess import DEVNULL, PIPE
+from typing import Callable, Iterable, Optional
+
+from mediatool.utils.logging import get_logger
+from mediatool.video.ops import probe, progress_stats
+from mediatool.video.pipelines.transcode_ffmpeg import (
+    THREADS_PER_ENCODER,
+    h264_command,
+    h264_output_path,
+)
+
+log = get_logger(__name__)
+
+_STDERR_TAIL = 5        # ffmpeg error lines kept per failed file
+
+
+def _result(src: Path, **fields) -> dict:
+    result = {"input": str(src), "output": None, "ok": False, "cancelled": False,
+              "returncode": None, "seconds": 0.0, "error": None}
+    result.update(fields)
+    return result
+
+
+class TranscodeBatch:
+    """
+    jobs: concurrent ffmpeg processes (default cpu_count // 8, at least 2, at most
+    one per input).
+    threads: -threads for each (default an even share of the cores).
+    progress(done, total, name[, stats]): called after each file, and about twice a
+    second for every running file with a fourth argument, that file's live ffmpeg
+    stats (frame, fps, speed, bitrate_kbps, eta, ...; see video.ops.run_ffmpeg).
+    Always from the thread that called run().
+
+    run() blocks and returns one result dict per input, in input order:
+    {input, output, ok, cancelled, returncode, seconds, error}. cancel() may be
+    called from any thread. Nothing new is started, and running processes are
+    killed and their partial outputs removed. No SIGTERM: ffmpeg would first
+    drain libx264's lookahead into a file that gets deleted anyway.
+    """
+
+    def __init__(self, inputs: Iterable[str | Path], out_dir: str | Path | None = None, crf=20,
+                 preset="medium", jobs: int | None = None, threads: int | None = None,
+                 progress: Optional[Callable[..., None]] = None):
+        self.inputs = [Path(p) for p in inputs]
+        self.out_dir = out_dir
+        self.crf = crf
+        self.preset = preset
+        cpus = os.cpu_count() or 1
+        self.jobs = max(1, min(int(jobs or max(2, cpus // THREADS_PER_ENCODER)), len(self.inputs)))
+        self.threads = max(1, int(threads or cpus // self.jobs))
+        self.progress = progress
+        self.results: list[dict | None] = [None] * len(self.inputs)
+        self.cancelled = False
+        self._done = 0
+        self._loop = None
+        self._procs = set()
+        self._outputs = set()
+
+    def run(self) -> list[dict]:
+        asyncio.run(self._main())
+        return self.results
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._kill)
+            except RuntimeError:   # loop already closed: nothing left to stop
+                pass
+
+    def _kill(self) -> None:
+        for proc in self._procs:
+            if proc.returncode is None:
+                proc.kill()
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        total = len(self.inputs)
+        self._done = 0
+        if self.progress:
+            self.progress(0, total, "start")
+        log.info("Transcoding %d files, %d ffmpeg processes x %d threads", total, self.jobs, self.threads)
+        queue = iter(enumerate(self.inputs))   # shared by the workers; they only switch at awaits
+
+        async def worker():
+            for i, src in queue:
+                try:
+                    self.results[i] = await self._transcode(src)
+                except Exception as e:   # e.g. the output folder cannot be created; the batch goes on
+                    log.error("ERR %s → %s", src.name, e)
+                    self.results[i] = _result(src, error=str(e))
+                self._done += 1
+                if self.progress:
+                    self.progress(self._done, total, src.name)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.jobs)))
+        finally:
+            self._kill()   # nothing outlives run(), whatever ended it
+            self._loop = None
+
+    async def _transcode(self, src: Path) -> dict:
+        if self.cancelled:
+            return _result(src, cancelled=True, error="cancelled")
+        out = h264_output_path(src, self.out_dir)
+        if out in self._outputs:   # same stem from two folders, or the same file twice
+            return _result(src, error=f"{out.name} is already written by another input")
+        self._outputs.add(out)
+        cmd = h264_command(src, out, self.crf, self.preset, self.threads, quiet=True)
+        cmd = [cmd[0], "-progress", "pipe:1", *cmd[1:]]
+        log.info("Running: %s", " ".join(cmd))
+        duration = None
+        if self.progress:   # header only, for the ETA
+            try:
+                duration = (await asyncio.to_thread(probe, src))["duration"]
+            except OSError:   # ffmpeg missing: reported by the run below
+                pass
+        t0 = time.perf_counter()
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd, stdin=DEVNULL, stdout=PIPE, stderr=PIPE)
+        except OSError as e:   # ffmpeg missing or not executable
+            log.error("ERR %s → %s", src.name, e)
+            return _result(src, error=str(e))
+        self._procs.add(proc)
+        if self.cancelled:   # cancel() ran while the process was starting
+            proc.kill()
+        try:
+            reader = asyncio.ensure_future(self._read_progress(proc.stdout, src, duration, t0))
+            stderr = await proc.stderr.read()
+            await reader
+            await proc.wait()
+        except BaseException:
+            out.unlink(missing_ok=True)   # half-written
+            raise
+        finally:
+            if proc.returncode is None:   # an error (or task cancellation) left it running
+                proc.kill()
+            self._procs.discard(proc)
+        seconds = time.perf_counter() - t0
+        if proc.returncode == 0:
+            log.info("OK %s → %s (%.1fs)", src.name, out.name, seconds)
+            return _result(src, output=str(out), ok=True, returncode=0, seconds=seconds)
+
+        out.unlink(missing_ok=True)
+        if self.cancelled:
+            return _result(src, cancelled=True, returncode=proc.returncode, seconds=seconds, error="cancelled")
+        lines = stderr.decode(errors="replace").strip().splitlines()
+        error = "\n".join(lines[-_STDERR_TAIL:]) or f"ffmpeg exited with code {proc.returncode}"
+        log.error("ERR %s → %s", src.name, error)
+        return _result(src, returncode=proc.returncode, seconds=seconds, error=error)
+
+    async def _read_progress(self, stream, src: Path, duration, t0: float) -> None:
+        """Turn ffmpeg's -progress blocks for `src` into live progress calls."""
+        block = {}
+        async for raw in stream:
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+            if value != "end" and self.progress:
+                stats = progress_stats(block, duration, time.perf_counter() - t0)
+                self.progress(self._done, len(self.inputs), src.name, stats)
+            block = {}
+
+
+def transcode_batch(inputs: Iterable[str | Path], out_dir: str | Path | None = None, **kwargs) -> list[dict]:
+    """Transcode every input to H.264, see TranscodeBatch; blocks until all are done."""
+    return TranscodeBatch(inputs, out_dir, **kwargs).run()
@@ -1,22 +1,237 @@
+from __future__ import annotations
+
+import bisect
+import os
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from mediatool.utils.config import FFMPEG_BIN
 from mediatool.utils.logging import get_logger
+from mediatool.video.ops import final_stats, probe, run_ffmpeg, scan_video
 
 log = get_logger(__name__)
 
-def transcode_h264(input_path: str | Path, out_dir: str | Path | None = None, crf=20, preset="medium"):
-    inp = Path(input_path)
-    out_dir = Path(out_dir) if out_dir else inp.parent
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out = out_dir / (inp.stem + "_h264.mp4")
-
-    cmd = [
-        FFMPEG_BIN, "-y", "-i", str(inp),
-        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
-        "-c:a", "aac", "-b:a", "192k",
-        str(out)
-    ]
+# libx264 stops scaling well past ~8 threads on one stream, so a many-core box
+# runs cpu_count // 8 encoders side by side: one per chunk in segmented mode, one
+# per file in transcode_batch.
+THREADS_PER_ENCODER = 8
+_SEGMENTS_PER_WORKER = 2      # spare chunks, so one slow chunk does not idle the other encoders at the end
+_MIN_SEGMENT_SECONDS = 10     # every chunk restarts x264's lookahead and rate control
+
+
+def _run(cmd):
     log.info("Running: %s", " ".join(cmd))
     subprocess.run(cmd, check=True)
+
+
+def h264_output_path(inp: Path, out_dir) -> Path:
+    """`<stem>_h264.mp4` in out_dir (created), or next to the input."""
+    out_dir = Path(out_dir) if out_dir else inp.parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir / (inp.stem + "_h264.mp4")
+
+
+def h264_command(inp: Path, out: Path, crf, preset, threads: int | None = None, quiet: bool = False) -> list[str]:
+    """
+    The one-process ffmpeg command for inp -> out. threads caps both the decoder
+    and libx264; quiet keeps the console to errors (for runs nobody watches).
+    """
+    cmd = [FFMPEG_BIN, "-y"]
+    if quiet:
+        cmd += ["-hide_banner", "-nostdin", "-nostats", "-loglevel", "error"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd += ["-i", str(inp), "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-c:a", "aac", "-b:a", "192k"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    return cmd + [str(out)]
+
+
+def _cut_frames(keyframes, duration: float, chunks: int) -> list[int]:
+    """
+    Packet indices of the keyframes closest to an even split of the video into
+    `chunks` parts, skipping any cut that would leave a chunk under
+    _MIN_SEGMENT_SECONDS.
+    """
+    times = [t for _, t in keyframes]
+    cuts = []
+    last = 0.0
+    for i in range(1, chunks):
+        target = duration * i / chunks
+        j = bisect.bisect_left(times, target)
+        best = min((k for k in (j - 1, j) if 0 <= k < len(times)), key=lambda k: abs(times[k] - target))
+        t = times[best]
+        if t - last >= _MIN_SEGMENT_SECONDS and duration - t >= _MIN_SEGMENT_SECONDS:
+            cuts.append(keyframes[best][0])
+            last = t
+    return cuts
+
+
+def _concat_list(paths) -> str:
+    lines = []
+    for p in paths:
+        escaped = str(Path(p).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    return "\n".join(lines) + "\n"
+
+
+def _av_offset(info: dict):
+    """Seconds the video starts after the audio (None without audio)."""
+    return None if info["audio_start"] is None else info["start"] - info["audio_start"]
+
+
+def _check(inp: dict, out: dict, src: Path, dst: Path) -> None:
+    """Same frame count, durations within one frame, A/V start offsets within one frame."""
+    frame = inp["duration"] / inp["frames"] if inp["frames"] else 0.0
+    if inp["frames"] != out["frames"] or abs(inp["duration"] - out["duration"]) > frame + 1e-6:
+        raise RuntimeError(
+            f"Transcode mismatch for {src.name} -> {dst.name}: "
+            f"{inp['frames']} frames / {inp['duration']:.3f}s in, "
+            f"{out['frames']} frames / {out['duration']:.3f}s out"
+        )
+    a, b = _av_offset(inp), _av_offset(out)
+    if a is not None and b is not None and abs(a - b) > frame + 1e-6:
+        raise RuntimeError(
+            f"A/V offset mismatch for {src.name} -> {dst.name}: "
+            f"video starts {a:+.3f}s after the audio in, {b:+.3f}s out"
+        )
+
+
+class _ChunkProgress:
+    """
+    Merges the -progress reports of the parallel chunk encoders, which arrive on
+    the pool threads, into one progress(done, total, stats) stream over the
+    whole video.
+    """
+
+    def __init__(self, progress, frames: int, duration: float):
+        self.progress = progress
+        self.frames = frames
+        self.duration = duration
+        self._done = {}
+        self._size = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def chunk(self, i: int):
+        def report(frame, _expected, stats):
+            with self._lock:
+                self._done[i] = frame
+                self._size[i] = stats["size_bytes"]
+                done = sum(self._done.values())
+                elapsed = time.perf_counter() - self._t0
+                rate = done / elapsed if elapsed > 0 else 0.0
+                out_time = self.duration * done / self.frames if self.frames else None
+                self.progress(done, self.frames, {
+                    "frame": done,
+                    "fps": rate,
+                    "speed": out_time / elapsed if out_time and elapsed > 0 else None,
+                    "bitrate_kbps": None,
+                    "size_bytes": sum(self._size.values()),
+                    "out_time": out_time,
+                    "elapsed": elapsed,
+                    "eta": (self.frames - done) / rate if rate else None,
+                    "done": False,
+                })
+        return report
+
+
+def _transcode_segmented(inp: Path, out: Path, crf, preset, workers: int, threads: int, info: dict,
+                         progress=None) -> bool:
+    """
+    Split the video stream at keyframes (stream copy), encode the chunks in parallel
+    ffmpeg processes, join them with the concat demuxer and add the audio, encoded
+    once from the source. Returns False, having done nothing, when the video has
+    too few keyframes or is too short for two chunks.
+
+    The chunks restart at 0 (-reset_timestamps), while the audio keeps the source
+    timestamps, less the container start ffmpeg subtracts from every input; the
+    joined video is shifted back by the same amount so a video stream that starts
+    late (or after the audio) stays in sync.
+    """
+    cuts = _cut_frames(info["keyframes"], info["duration"], workers * _SEGMENTS_PER_WORKER)
+    if not cuts:
+        return False
+    with tempfile.TemporaryDirectory(prefix=".h264_", dir=out.parent) as tmp:
+        tmp = Path(tmp)
+        # NUT keeps the source time base exactly (Matroska would round to ms)
+        _run([FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", str(inp),
+              "-map", "0:v:0", "-c", "copy", "-f", "segment", "-segment_format", "nut",
+              "-segment_frames", ",".join(map(str, cuts)), "-reset_timestamps", "1",
+              str(tmp / "in_%04d.nut")])
+        chunks = sorted(tmp.glob("in_*.nut"))
+        encoded = [c.with_suffix(".mp4") for c in chunks]
+        cmds = [[FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y", "-i", str(c), "-map", "0:v:0",
+                 "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", str(threads), str(e)]
+                for c, e in zip(chunks, encoded)]
+        log.info("Encoding %d chunks on %d ffmpeg processes x %d threads", len(cmds), workers, threads)
+        tracker = _ChunkProgress(progress, info["frames"], info["duration"]) if progress else None
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(lambda i: run_ffmpeg(cmds[i], tracker.chunk(i) if tracker else None), range(len(cmds))))
+
+        listing = tmp / "chunks.txt"
+        listing.write_text(_concat_list(encoded), encoding="utf-8")
+        origin = probe(inp)["start"]
+        if origin is None:
+            origin = min(info["start"], info["audio_start"] if info["audio_start"] is not None else info["start"])
+        offset = max(info["start"] - origin, 0.0)
+        _run([FFMPEG_BIN, "-y", "-itsoffset", f"{offset:.6f}",
+              "-f", "concat", "-safe", "0", "-i", str(listing), "-i", str(inp),
+              "-map", "0:v:0", "-map", "1:a:0?", "-map_metadata", "1",
+              "-c:v", "copy", "-c:a", "aac", "-b:a", "192k", str(out)])
+    return True
+
+
+def transcode_h264(input_path: str | Path, out_dir: str | Path | None = None, crf=20, preset="medium",
+                   segmented: bool = False, workers: int | None = None, threads: int | None = None,
+                   verify: bool | None = None, progress=None):
+    """
+    segmented: encode GOP-aligned chunks in parallel ffmpeg processes instead of one
+    process over the whole file (see _transcode_segmented). workers: concurrent
+    encoders (default cpu_count // 8, at least 2); threads: libx264 threads each
+    (default an even share of the cores). Falls back to one process when
+    workers=1 or the input cannot be split into at least two chunks.
+    verify: compare frame count and duration of output and input (packet scan, no
+    decode) and raise RuntimeError on a mismatch; on by default in segmented mode.
+    progress(frames done, frames total, stats): live ffmpeg telemetry (fps, speed,
+    bitrate, eta, ...), then one final record with done=True; see
+    video.ops.run_ffmpeg. In segmented mode it covers the chunk encoders, summed.
+    """
+    inp = Path(input_path)
+    out = h264_output_path(inp, out_dir)
+    verify = segmented if verify is None else verify
+
+    info = scan_video(inp) if segmented or verify else None
+    t0 = time.perf_counter()
+    done = False
+    if segmented:
+        cpus = os.cpu_count() or 1
+        n = int(workers) if workers else max(2, cpus // THREADS_PER_ENCODER)
+        if n > 1:
+            done = _transcode_segmented(inp, out, crf, preset, n, max(1, int(threads or cpus // n)), info,
+                                        progress)
+            if not done:
+                log.info("%s: not splittable into chunks, using one ffmpeg process", inp.name)
+        else:
+            log.info("%s: workers=%d, using one ffmpeg process", inp.name, n)
+        if done:
+            final = final_stats(info["frames"], time.perf_counter() - t0, info["duration"], out.stat().st_size)
+            if progress:
+                progress(info["frames"], info["frames"], final)
+
+    if not done:
+        if info:
+            duration, frames = info["duration"], info["frames"]
+        else:   # header only: the frame total is an estimate
+            meta = probe(inp) if progress else {}
+            duration, frames = meta.get("duration"), None
+            if duration and meta.get("fps"):
+                frames = round(duration * meta["fps"])
+        run_ffmpeg(h264_command(inp, out, crf, preset, threads), progress, duration, frames)
+
+    if verify:
+        _check(info, scan_video(out), inp, out)
     return out